@@ -0,0 +1,129 @@
+"""
+run the story from main.py without a window or a real time clock
+
+the environment is updated in a loop as fast as it will go.  time in the
+simulation only moves when the environment is updated, and the organs beat
+on the environment's clock, so a tick takes as long as it needs to run.
+
+    python headless.py --ticks 100000
+    python headless.py --until married --ticks 1000000
+
+when done, the number of ticks, plans and precepts per second are printed.
+"""
+import argparse
+import time
+
+from pygoap.precepts import DatumPrecept
+
+
+def find_agent(env, name):
+    for agent in env.agents:
+        if agent.name == name:
+            return agent
+    raise KeyError(name)
+
+
+def believes(env, name, key, value):
+    """
+    return True if the agent called name knows DatumPrecept(self, key, value)
+    """
+    agent = find_agent(env, name)
+    if isinstance(value, str):
+        value = find_agent(env, value)
+    return DatumPrecept(agent, key, value) in agent.memory
+
+
+# story conditions that --until can stop at
+conditions = {
+    'married': lambda env: believes(env, 'liz', 'married', 'neil'),
+    'baby': lambda env: believes(env, 'liz', 'has baby', True),
+}
+
+
+class Report:
+    """
+    what happened in a run
+    """
+
+    def __init__(self):
+        self.ticks = 0
+        self.plans = 0
+        self.precepts = 0
+        self.seconds = 0.0
+        self.stopped = False    # the condition was met
+
+    def __repr__(self):
+        return "<Report: {} ticks, {} plans, {} precepts in {:.3f}s>".format(
+            self.ticks, self.plans, self.precepts, self.seconds)
+
+    def rate(self, count):
+        return count / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        lines = ["{:>10} ticks    {:>12.1f}/s".format(
+                     self.ticks, self.rate(self.ticks)),
+                 "{:>10} plans    {:>12.1f}/s".format(
+                     self.plans, self.rate(self.plans)),
+                 "{:>10} precepts {:>12.1f}/s".format(
+                     self.precepts, self.rate(self.precepts))]
+        return "\n".join(lines)
+
+
+def run(env, ticks=None, condition=None, dt=1):
+    """
+    update env ticks times, or until condition(env) is true.  condition is
+    checked after every tick.  one of them must be given.
+
+    return a Report
+    """
+    if ticks is None and condition is None:
+        raise ValueError("give the number of ticks or a condition")
+
+    report = Report()
+
+    # deref for speed
+    update = env.update
+    timer = time.perf_counter
+
+    start = timer()
+    tick = 0
+    while ticks is None or tick < ticks:
+        update(dt)
+        tick += 1
+        report.plans += env.plans_made
+        report.precepts += env.precepts_delivered
+        if condition is not None and condition(env):
+            report.stopped = True
+            break
+    report.seconds = timer() - start
+    report.ticks = tick
+    return report
+
+
+def main():
+    from main import build
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument('--ticks', type=int, default=None,
+                        help='stop after this many ticks')
+    parser.add_argument('--until', choices=sorted(conditions),
+                        help='stop when this happens in the story')
+    parser.add_argument('--dt', type=float, default=1.0,
+                        help='time that passes each tick')
+    args = parser.parse_args()
+
+    ticks = args.ticks
+    if ticks is None and args.until is None:
+        ticks = 10000
+
+    env = build()
+    env.start()
+    report = run(env, ticks, conditions.get(args.until), args.dt)
+    if args.until is not None:
+        print("{} {}at time {}".format(
+            args.until, "" if report.stopped else "did not happen ", env.time))
+    print(report.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,76 +1,77 @@
-from heapq import heappush, heappop, heappushpop
+from heapq import heappush, heappop
 
+from pathfinding.grid import Grid, BLOCKED
 
-def get_surrounding(node):
-    x, y = node[0], node[1]
-    return ((x-1, y-1), (x, y-1), (x+1, y-1), (x-1, y),
-            (x+1, y), (x-1, y+1), (x, y+1), (x+1, y+1))
 
+def astar(grid, start, finish):
+    """
+    perform a* search on a grid.
 
-def dist(start, finish):
-    return abs(finish[0] - start[0]) + abs(finish[1] - start[1])
-
+    return the cheapest path from start to finish as a list of (x, y)
+    positions, including both ends, or an empty list if there is no path.
+    """
+    if start not in grid or finish not in grid:
+        return list()
+
+    node_of = grid.node
+    start = node_of(start)
+    goal = node_of(finish)
+    if grid.costs[goal] == BLOCKED:
+        return list()
+
+    # deref for speed
+    neighbors = grid.neighbors
+    h = grid.octile
+
+    # nodes are not removed from the heap when a cheaper way to them is
+    # found; stale entries are skipped when they are popped
+    heap = [(h(start, goal), start)]
+    g = {start: 0.0}
+    parent = {start: None}
+    closed = set()
+
+    while heap:
+        f, node = heappop(heap)
+        if node in closed:
+            continue
+        if node == goal:
+            return _path(grid, parent, node)
+        closed.add(node)
+        node_g = g[node]
+        for neighbor, cost in neighbors(node):
+            if neighbor in closed:
+                continue
+            _g = node_g + cost
+            if _g < g.get(neighbor, _g + 1):
+                g[neighbor] = _g
+                parent[neighbor] = node
+                heappush(heap, (_g + h(neighbor, goal), neighbor))
 
-def clip(coords, lowest, highest):
-    for v in coords:
-        if lowest[0] <= v[0] <= highest[0] and lowest[1] <= v[1] <= highest[1]:
-            yield v
+    return list()
 
 
-def calc_h(start, finish):
-    return abs(finish[0] - start[0]) + abs(finish[1] - finish[1])
+def _path(grid, parent, node):
+    position = grid.position
+    path = list()
+    while node is not None:
+        path.append(position(node))
+        node = parent[node]
+    path.reverse()
+    return path
 
 
 def search(start, finish, low, high):
     """
-    perform basic a* search on a 2d map.
-    """
-    def available(node):
-        return node not in closed_set
-
-    heap = list()
-    open_set = set()
-    closed_set = set()
-    parent = dict()
-    heap_index = dict()
-    g = dict()
-
-    pushback = (0, start)
-    g[start] = 0
-    open_set.add(start)
-
-    while heap or pushback:
-        if pushback:
-            f, node = heappushpop(heap, pushback)
-            pushback = None
-        else:
-            f, node = heappop(heap)
-        if node == finish:
-            path = [node]
-            while parent.get(node, None) is not None:
-                node = parent[node]
-                path.append(node)
-            return path
-        open_set.remove(node)
-        closed_set.add(node)
-        neighbors = filter(available, clip(get_surrounding(node), low, high))
-        for neighbor in neighbors:
-            _g = g[node] + dist(node, neighbor)
-            if neighbor not in open_set or _g < g[neighbor]:
-                parent[neighbor] = node
-                g[neighbor] = _g
-                _f = _g + calc_h(neighbor, finish)
-                if neighbor in open_set:
-                    heap.remove(heap_index[neighbor])
-                else:
-                    open_set.add(neighbor)
-                entry = (_f, neighbor)
-                heap_index[neighbor] = entry
-                if pushback:
-                    heappush(heap, pushback)
-                pushback = entry
+    perform basic a* search on an open 2d map.
 
-    return list()
+    return the path from finish back to start.
+    """
+    ox, oy = low
+    grid = Grid(high[0] - ox + 1, high[1] - oy + 1)
+    path = astar(grid, (start[0] - ox, start[1] - oy),
+                 (finish[0] - ox, finish[1] - oy))
+    path.reverse()
+    return [(x + ox, y + oy) for x, y in path]
 
 
 def test():
@@ -92,4 +93,5 @@ if __name__ == '__main__':
             [0, 1, 0, 0, 0, 0, 0, 0, 0, 0]]
 
     print((test()))
+    print((astar(Grid.from_rows(area), (0, 0), (9, 9))))
     print((min(timeit.repeat("test()", number=10000, setup="from __main__ import test"))))
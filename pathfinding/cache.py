@@ -0,0 +1,76 @@
+"""
+Many agents ask for the same paths: to the same homes, to the same people.
+A PathCache remembers the paths found on a grid, so they are not searched
+again while the map stays the same.
+
+Paths are keyed by (start, finish, grid version).  When the grid changes,
+every cached path is dropped.
+"""
+from collections import OrderedDict
+from threading import Lock
+
+
+class PathCache:
+    """
+    LRU cache of paths.  find(grid, start, finish) is called on a miss.
+    """
+
+    def __init__(self, find, size=1024):
+        self.find = find
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._paths = OrderedDict()
+        self._grid = None
+        self._version = None
+        # agents may plan in threads and share a cache
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __repr__(self):
+        return "<PathCache: {}/{}, hits: {}, misses: {}, evictions: {}>" \
+            .format(len(self), self.size, self.hits, self.misses,
+                    self.evictions)
+
+    def path(self, grid, start, finish):
+        """
+        Same as find(grid, start, finish), but use the cache.  The caller
+        owns the list that is returned.
+        """
+        version = grid.version
+        key = start, finish, version
+        with self._lock:
+            if grid is not self._grid or version != self._version:
+                self.invalidations += len(self._paths)
+                self._paths.clear()
+                self._grid = grid
+                self._version = version
+
+            try:
+                path = self._paths[key]
+            except KeyError:
+                path = None
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._paths.move_to_end(key)
+
+        if path is None:
+            path = self.find(grid, start, finish)
+            with self._lock:
+                # the grid could have changed while searching; the version
+                # in the key keeps an old path from being used
+                self._paths[key] = path
+                while len(self._paths) > self.size:
+                    self._paths.popitem(last=False)
+                    self.evictions += 1
+
+        return list(path)
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
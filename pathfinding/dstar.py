@@ -0,0 +1,217 @@
+"""
+Incremental replanning with D* Lite.
+
+A DStarLite object keeps the search it did for one goal.  When a few cells
+change, only the part of the search that depended on them is redone, which
+is much cheaper than searching again when an obstacle moves or another agent
+blocks a corridor.  The start may move along the path as the agent walks.
+
+The search runs backward from the goal, so g[node] is the cost of the
+cheapest path from node to the goal.  Moves follow the same rules as
+pathfinding.astar.
+
+    planner = DStarLite(grid, (0, 0), (40, 25))
+    path = planner.path()
+    grid.block(path[5])
+    path = planner.path()     # repaired, not searched again
+"""
+from heapq import heappush, heappop
+from math import inf
+
+from pathfinding.grid import BLOCKED, SQRT2
+
+
+EPSILON = 1e-9
+
+
+class DStarLite:
+    """
+    Path from start to goal that is repaired when the grid changes
+    """
+
+    def __init__(self, grid, start, goal):
+        self.grid = grid
+        self.start = grid.node(start)
+        self.goal = grid.node(goal)
+        self.expanded = 0
+        self._reset()
+
+    def __repr__(self):
+        return "<DStarLite: {} to {}>".format(
+            self.grid.position(self.start), self.grid.position(self.goal))
+
+    def _reset(self):
+        self.version = self.grid.version
+        self._h_scale = self.grid.min_cost
+        self._last = self.start
+        self.km = 0.0
+        self.g = dict()
+        self.rhs = {self.goal: 0.0}
+        self._heap = [(self._key(self.goal), self.goal)]
+
+    def _h(self, node):
+        # octile distance from the start, scaled by the cheapest cell when
+        # the search began, so stored keys stay comparable
+        width = self.grid.width
+        dy, dx = divmod(node, width)
+        sy, sx = divmod(self.start, width)
+        dx = abs(dx - sx)
+        dy = abs(dy - sy)
+        if dx < dy:
+            dx, dy = dy, dx
+        return (dx + (SQRT2 - 1) * dy) * self._h_scale
+
+    def _key(self, node):
+        best = min(self.g.get(node, inf), self.rhs.get(node, inf))
+        return best + self._h(node) + self.km, best
+
+    def _update_vertex(self, node):
+        g = self.g
+        if node != self.goal:
+            rhs = inf
+            for other, cost in self.grid.neighbors(node):
+                cost += g.get(other, inf)
+                if cost < rhs:
+                    rhs = cost
+            self.rhs[node] = rhs
+        # nodes are not removed from the heap; stale entries are skipped
+        if g.get(node, inf) != self.rhs.get(node, inf):
+            heappush(self._heap, (self._key(node), node))
+
+    def _compute(self):
+        # deref for speed
+        g = self.g
+        rhs = self.rhs
+        heap = self._heap
+        neighbors = self.grid.neighbors
+        update = self._update_vertex
+        key = self._key
+        start = self.start
+
+        around = ()
+        if self.grid.costs[start] == BLOCKED:
+            # a search may start on a blocked cell, like a*.  no cell steps
+            # onto it, so its cost is the best of its open neighbors
+            around = {other for other, cost in neighbors(start)}
+            update(start)
+
+        while heap:
+            k_old, node = heap[0]
+            node_g = g.get(node, inf)
+            node_rhs = rhs.get(node, inf)
+            if node_g == node_rhs:
+                # stale entry
+                heappop(heap)
+                continue
+
+            if rhs.get(start, inf) == g.get(start, inf):
+                # keys that differ by rounding error are equal, and every
+                # node that ties with the start is settled
+                if k_old[0] > key(start)[0] + EPSILON:
+                    break
+            heappop(heap)
+
+            k_new = key(node)
+            if k_old < k_new:
+                heappush(heap, (k_new, node))
+                continue
+
+            self.expanded += 1
+            if node_g > node_rhs:
+                g[node] = node_rhs
+            else:
+                g[node] = inf
+                update(node)
+            # cells that can step onto node are its neighbors
+            for other, cost in neighbors(node):
+                update(other)
+            if node in around:
+                update(start)
+
+    def move(self, position):
+        """
+        Tell the planner the agent is now at position
+        """
+        node = self.grid.node(position)
+        if node != self.start:
+            self.start = node
+            self.km += self._h(self._last)
+            self._last = node
+
+    def update(self, positions=None):
+        """
+        Repair the search after cells changed.  If positions is None, the
+        changes are read from the grid.
+        """
+        grid = self.grid
+        if positions is None:
+            nodes = grid.changed_since(self.version)
+        else:
+            nodes = [grid.node(p) for p in positions]
+        self.version = grid.version
+
+        if nodes is None or grid.min_cost < self._h_scale:
+            # too much changed to repair; start over
+            self._reset()
+            return
+
+        # a cell's cost changes the moves into it, and blocking a cell
+        # changes the diagonal moves around it
+        width = grid.width
+        height = grid.height
+        touched = set()
+        for node in nodes:
+            y, x = divmod(node, width)
+            for yy in range(max(y - 1, 0), min(y + 2, height)):
+                row = yy * width
+                for xx in range(max(x - 1, 0), min(x + 2, width)):
+                    touched.add(row + xx)
+
+        for node in touched:
+            self._update_vertex(node)
+
+    def path(self):
+        """
+        return the path from start to goal as a list of (x, y) positions,
+        including both ends, or an empty list if there is no path.
+
+        the grid's changes since the last call are repaired first.
+        """
+        grid = self.grid
+        if grid.version != self.version:
+            self.update()
+        if grid.costs[self.goal] == BLOCKED:
+            return list()
+        self._compute()
+
+        g = self.g
+        node = self.start
+        if g.get(node, inf) == inf:
+            return list()
+
+        position = grid.position
+        neighbors = grid.neighbors
+        path = [position(node)]
+        for i in range(len(grid)):
+            if node == self.goal:
+                return path
+            best, best_cost = None, inf
+            for other, cost in neighbors(node):
+                cost += g.get(other, inf)
+                if cost < best_cost:
+                    best, best_cost = other, cost
+            if best is None:
+                break
+            node = best
+            path.append(position(node))
+        return list()
+
+    @property
+    def cost(self):
+        """
+        Cost of the current path; inf if there is none
+        """
+        if self.grid.version != self.version:
+            self.update()
+        self._compute()
+        return self.g.get(self.start, inf)
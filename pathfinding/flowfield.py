@@ -0,0 +1,134 @@
+"""
+Flow fields: the cheapest way to one goal from every cell on the map.
+
+A FlowField runs Dijkstra once, outward from the goal, and keeps the next
+cell to step to from every cell.  After that, any number of agents heading
+for the same goal can read their next step in O(1), or follow the field to
+get a whole path.
+
+The field is only right for the grid version it was built for; see stale.
+"""
+from array import array
+from heapq import heappush, heappop
+from math import inf
+
+from pathfinding.grid import BLOCKED, SQRT2
+
+
+class FlowField:
+    """
+    Cheapest next steps toward goal from every cell of a Grid
+    """
+
+    def __init__(self, grid, goal):
+        self.grid = grid
+        self.goal = goal
+        self.version = grid.version
+        self.costs = array('d', [inf]) * len(grid)
+        self.next = array('l', [-1]) * len(grid)
+        self._build()
+
+    def __repr__(self):
+        return "<FlowField: {} {}>".format(self.goal, self.version)
+
+    @property
+    def stale(self):
+        """
+        True if the grid has changed since the field was built
+        """
+        return self.version != self.grid.version
+
+    def _build(self):
+        grid = self.grid
+        if self.goal not in grid:
+            return
+        goal = grid.node(self.goal)
+        if grid.costs[goal] == BLOCKED:
+            return
+
+        # deref for speed
+        width = grid.width
+        costs = grid.costs
+        neighbors = grid.neighbors
+        dist = self.costs
+        next_ = self.next
+
+        # searching outward from the goal: a step from other to node costs
+        # what it costs to enter node.  moves are symmetric, so the cells
+        # that can reach node are its neighbors.
+        dist[goal] = 0.0
+        heap = [(0.0, goal)]
+        while heap:
+            d, node = heappop(heap)
+            if d > dist[node]:
+                continue
+            straight = costs[node]
+            diagonal = straight * SQRT2
+            for other, _ in neighbors(node):
+                step = node - other
+                if step == 1 or step == -1 or step == width or \
+                        step == -width:
+                    _d = d + straight
+                else:
+                    _d = d + diagonal
+                if _d < dist[other]:
+                    dist[other] = _d
+                    next_[other] = node
+                    heappush(heap, (_d, other))
+
+    def _step(self, node):
+        """
+        Return (next node, cost to goal) from node.  Blocked cells are not
+        in the field, but a search may start on one, like a*.
+        """
+        if self.grid.costs[node] != BLOCKED:
+            return self.next[node], self.costs[node]
+
+        costs = self.costs
+        best, best_cost = -1, inf
+        for other, cost in self.grid.neighbors(node):
+            cost += costs[other]
+            if cost < best_cost:
+                best, best_cost = other, cost
+        return best, best_cost
+
+    def cost(self, position):
+        """
+        Cost of the cheapest path from position to the goal; inf if none
+        """
+        if position not in self.grid:
+            return inf
+        return self._step(self.grid.node(position))[1]
+
+    def next_step(self, position):
+        """
+        Return the cell to move to from position, or None if position is
+        the goal or cannot reach it
+        """
+        if position not in self.grid:
+            return None
+        node = self._step(self.grid.node(position))[0]
+        if node < 0:
+            return None
+        return self.grid.position(node)
+
+    def path(self, start):
+        """
+        return the path from start to the goal as a list of (x, y)
+        positions, including both ends, or an empty list if there is none.
+        """
+        if start not in self.grid:
+            return list()
+        node, cost = self._step(self.grid.node(start))
+        if cost == inf:
+            return list()
+
+        # deref for speed
+        next_ = self.next
+        position = self.grid.position
+
+        path = [start]
+        while node >= 0:
+            path.append(position(node))
+            node = next_[node]
+        return path
@@ -0,0 +1,185 @@
+"""
+Compact cost maps for grid pathfinding.
+
+Cells are numbered row by row, so a cell is a single integer instead of a
+tuple:  node = y * width + x.  Costs are kept in a flat array of doubles.  A
+cost is the price of entering a cell; BLOCKED cells cannot be entered.
+"""
+from array import array
+from collections import deque
+from math import inf, sqrt
+
+
+BLOCKED = inf
+SQRT2 = sqrt(2)
+
+
+class Grid:
+    """
+    2D map of movement costs
+    """
+
+    change_log = 4096   # changed cells remembered for incremental searches
+
+    def __init__(self, width, height, cost=1.0):
+        self.width = width
+        self.height = height
+        self.costs = array('d', [cost]) * (width * height)
+        self.base_cost = cost
+        self.min_cost = cost
+        self.version = 0
+        self._weighted = 0      # open cells that do not cost base_cost
+        self._walls = None
+        self._changes = deque(maxlen=self.change_log)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Make a grid from rows of numbers; 0 is open and 1 is blocked.
+        """
+        grid = cls(len(rows[0]), len(rows))
+        for y, row in enumerate(rows):
+            for x, value in enumerate(row):
+                if value:
+                    grid.block((x, y))
+        return grid
+
+    def __len__(self):
+        return len(self.costs)
+
+    def __contains__(self, position):
+        x, y = position
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def node(self, position):
+        x, y = position
+        return y * self.width + x
+
+    def position(self, node):
+        y, x = divmod(node, self.width)
+        return x, y
+
+    def cost(self, position):
+        return self.costs[self.node(position)]
+
+    def set_cost(self, position, cost):
+        """
+        Change the cost of entering a cell.  Costs must be at least 0.
+        """
+        node = self.node(position)
+        old = self.costs[node]
+        if old != cost:
+            self.costs[node] = cost
+            if cost < self.min_cost:
+                self.min_cost = cost
+            self._weighted += (self._is_weighted(cost) -
+                               self._is_weighted(old))
+            self._changes.append(node)
+            self.version += 1
+
+    def changed_since(self, version):
+        """
+        Return the nodes changed since version, oldest first, or None if the
+        change log does not go back that far.
+        """
+        count = self.version - version
+        changes = self._changes
+        if count > len(changes):
+            return None
+        return [changes[-i] for i in range(count, 0, -1)]
+
+    def _is_weighted(self, cost):
+        return cost != self.base_cost and cost != BLOCKED
+
+    @property
+    def uniform(self):
+        """
+        True if every open cell has the same cost
+        """
+        return self._weighted == 0
+
+    def block(self, position):
+        self.set_cost(position, BLOCKED)
+
+    def unblock(self, position, cost=None):
+        if cost is None:
+            cost = self.base_cost
+        self.set_cost(position, cost)
+
+    def is_blocked(self, position):
+        return self.costs[self.node(position)] == BLOCKED
+
+    def walls(self):
+        """
+        Return a bytearray of blocked cells with a blocked border one cell
+        wide around the map, so searches never need bounds checks.  Cell
+        (x, y) is at (y + 1) * (width + 2) + x + 1.
+
+        The result is cached until the grid changes; do not modify it.
+        """
+        if self._walls is not None and self._walls[0] == self.version:
+            return self._walls[1]
+
+        width = self.width
+        costs = self.costs
+        border = bytes((1,))
+        walls = bytearray(border * (width + 2))
+        for start in range(0, len(costs), width):
+            walls += border
+            walls += bytes(c == BLOCKED for c in costs[start:start + width])
+            walls += border
+        walls += border * (width + 2)
+        self._walls = self.version, walls
+        return walls
+
+    def neighbors(self, node):
+        """
+        Yield (neighbor, cost) for each cell that can be entered from node.
+
+        Diagonal moves cost sqrt(2) times as much, and are not allowed to
+        cut the corner of a blocked cell.
+        """
+        width = self.width
+        costs = self.costs
+        y, x = divmod(node, width)
+        left = x > 0
+        right = x < width - 1
+        up = y > 0
+        down = y < self.height - 1
+
+        n = node - width
+        s = node + width
+        w_open = left and costs[node - 1] != BLOCKED
+        e_open = right and costs[node + 1] != BLOCKED
+        n_open = up and costs[n] != BLOCKED
+        s_open = down and costs[s] != BLOCKED
+
+        if w_open:
+            yield node - 1, costs[node - 1]
+        if e_open:
+            yield node + 1, costs[node + 1]
+        if n_open:
+            yield n, costs[n]
+            if w_open and costs[n - 1] != BLOCKED:
+                yield n - 1, costs[n - 1] * SQRT2
+            if e_open and costs[n + 1] != BLOCKED:
+                yield n + 1, costs[n + 1] * SQRT2
+        if s_open:
+            yield s, costs[s]
+            if w_open and costs[s - 1] != BLOCKED:
+                yield s - 1, costs[s - 1] * SQRT2
+            if e_open and costs[s + 1] != BLOCKED:
+                yield s + 1, costs[s + 1] * SQRT2
+
+    def octile(self, node, goal):
+        """
+        Admissible estimate of the cost from node to goal.
+        """
+        width = self.width
+        dy, dx = divmod(node, width)
+        gy, gx = divmod(goal, width)
+        dx = abs(dx - gx)
+        dy = abs(dy - gy)
+        if dx < dy:
+            dx, dy = dy, dx
+        return (dx + (SQRT2 - 1) * dy) * self.min_cost
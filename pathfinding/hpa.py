@@ -0,0 +1,327 @@
+"""
+Hierarchical pathfinding (HPA*) for large grids.
+
+The grid is cut into square clusters.  Where two clusters touch, each run of
+open cells along the border becomes an entrance: a pair of nodes, one on
+each side.  Nodes in the same cluster are joined by the cost of the cheapest
+path between them that stays inside the cluster.  This abstract graph is
+built once; when cells change, only the clusters that hold them and the
+borders around those clusters are built again.
+
+A query links start and finish to the nodes of their clusters, searches the
+small abstract graph, then refines each abstract step with a short A*
+search.  Paths are close to optimal, not always optimal.
+"""
+from heapq import heappush, heappop
+from math import inf
+
+from pathfinding.astar import astar
+from pathfinding.grid import BLOCKED, SQRT2
+
+
+class HierarchicalMap:
+    """
+    Abstract graph over a Grid.  It is updated if the grid changes.
+    """
+
+    # runs of open border cells at least this long get two entrances
+    long_entrance = 6
+
+    def __init__(self, grid, cluster_size=16):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.version = None
+        self.edges = dict()
+        self.cluster_nodes = dict()
+        self.entrances = dict()     # (cluster, cluster) -> [(node, node)]
+        self.build()
+
+    def __repr__(self):
+        return "<HierarchicalMap: {} nodes, {} edges>".format(
+            len(self.edges), sum(len(i) for i in self.edges.values()))
+
+    def cluster(self, node):
+        y, x = divmod(node, self.grid.width)
+        return x // self.cluster_size, y // self.cluster_size
+
+    def bounds(self, cluster):
+        """
+        Return (left, top, right, bottom) of a cluster, edges included
+        """
+        size = self.cluster_size
+        cx, cy = cluster
+        left = cx * size
+        top = cy * size
+        return (left, top, min(left + size, self.grid.width) - 1,
+                min(top + size, self.grid.height) - 1)
+
+    def cells(self, cluster):
+        """
+        Return the set of nodes in a cluster
+        """
+        left, top, right, bottom = self.bounds(cluster)
+        width = self.grid.width
+        return set(y * width + x for y in range(top, bottom + 1)
+                   for x in range(left, right + 1))
+
+    def borders(self, cluster):
+        """
+        Return the borders of a cluster as (cluster, cluster) pairs, the
+        left or upper cluster first
+        """
+        size = self.cluster_size
+        columns = (self.grid.width - 1) // size
+        rows = (self.grid.height - 1) // size
+        cx, cy = cluster
+        borders = list()
+        if cx > 0:
+            borders.append(((cx - 1, cy), cluster))
+        if cx < columns:
+            borders.append((cluster, (cx + 1, cy)))
+        if cy > 0:
+            borders.append(((cx, cy - 1), cluster))
+        if cy < rows:
+            borders.append((cluster, (cx, cy + 1)))
+        return borders
+
+    def build(self):
+        """
+        Build the graph.  If it was built before and the grid remembers what
+        changed since, only the clusters with changed cells are built again.
+        """
+        grid = self.grid
+        changed = None
+        if self.version is not None:
+            changed = grid.changed_since(self.version)
+
+        if changed is None:
+            size = self.cluster_size
+            clusters = {(cx, cy)
+                        for cx in range((grid.width - 1) // size + 1)
+                        for cy in range((grid.height - 1) // size + 1)}
+            self.edges = dict()
+            self.cluster_nodes = dict()
+            self.entrances = dict()
+            borders = {border for cluster in clusters
+                       for border in self.borders(cluster)}
+        else:
+            clusters = {self.cluster(node) for node in changed}
+            borders = {border for cluster in clusters
+                       for border in self.borders(cluster)}
+            # the other side of a border gets new entrances too
+            clusters.update(cluster for border in borders
+                            for cluster in border)
+
+        for border in borders:
+            self.entrances[border] = self._find_entrances(border)
+        for cluster in clusters:
+            self._link(cluster)
+        self.version = grid.version
+
+    def _find_entrances(self, border):
+        """
+        Return the (node, node) pairs that cross a border
+        """
+        left, top, right, bottom = self.bounds(border[0])
+        if border[0][1] == border[1][1]:
+            # border with the cluster to the right
+            pairs = [((right, y), (right + 1, y))
+                     for y in range(top, bottom + 1)]
+        else:
+            # border with the cluster below
+            pairs = [((x, bottom), (x, bottom + 1))
+                     for x in range(left, right + 1)]
+
+        grid = self.grid
+        node = grid.node
+        costs = grid.costs
+
+        entrances = list()
+        run = list()
+        for pair in pairs + [None]:
+            if pair is not None:
+                a, b = node(pair[0]), node(pair[1])
+                if costs[a] != BLOCKED and costs[b] != BLOCKED:
+                    run.append((a, b))
+                    continue
+            if not run:
+                continue
+            if len(run) >= self.long_entrance:
+                entrances.extend((run[0], run[-1]))
+            else:
+                entrances.append(run[len(run) // 2])
+            run = list()
+        return entrances
+
+    def _link(self, cluster):
+        """
+        Find the nodes of a cluster from its borders and join them
+        """
+        edges = self.edges
+        costs = self.grid.costs
+        for node in self.cluster_nodes.pop(cluster, ()):
+            del edges[node]
+
+        nodes = set()
+        for border in self.borders(cluster):
+            for a, b in self.entrances[border]:
+                if border[1] == cluster:
+                    a, b = b, a
+                nodes.add(a)
+                edges.setdefault(a, dict())[b] = costs[b]
+        if not nodes:
+            return
+
+        inside = self.cells(cluster)
+        for node in nodes:
+            dist = self._search(node, inside, nodes)
+            for other in nodes:
+                if other != node and other in dist:
+                    edges[node][other] = dist[other]
+        self.cluster_nodes[cluster] = nodes
+
+    def _search(self, source, inside, targets=()):
+        """
+        Dijkstra from source without leaving the inside set of nodes.  Stops
+        early once every target is settled.  Return {node: cost}.
+        """
+        neighbors = self.grid.neighbors
+        remaining = set(targets)
+        remaining.discard(source)
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        closed = set()
+        while heap:
+            d, node = heappop(heap)
+            if node in closed:
+                continue
+            closed.add(node)
+            if remaining:
+                remaining.discard(node)
+                if not remaining:
+                    break
+            for neighbor, cost in neighbors(node):
+                if neighbor not in inside:
+                    continue
+                _d = d + cost
+                if _d < dist.get(neighbor, inf):
+                    dist[neighbor] = _d
+                    heappush(heap, (_d, neighbor))
+        return dist
+
+    def path(self, start, finish):
+        """
+        return a path from start to finish as a list of (x, y) positions,
+        including both ends, or an empty list if there is no path.
+        """
+        grid = self.grid
+        if start not in grid or finish not in grid or \
+                grid.is_blocked(finish):
+            return list()
+
+        if self.version != grid.version:
+            self.build()
+
+        s = grid.node(start)
+        f = grid.node(finish)
+        start_cluster = self.cluster(s)
+        finish_cluster = self.cluster(f)
+        if start_cluster == finish_cluster:
+            return astar(grid, start, finish)
+
+        # link start and finish to the nodes of their clusters
+        costs = grid.costs
+        inside, nodes = self._around(s)
+        targets = nodes | {f} if f in inside else nodes
+        dist = self._search(s, inside, targets)
+        if f in dist:
+            # close enough to search for directly
+            return astar(grid, start, finish)
+        from_start = {n: dist[n] for n in nodes if n in dist}
+        # searching out from finish gives the cost of the reverse path;
+        # entering finish instead of n is the only difference
+        inside, nodes = self._around(f)
+        dist = self._search(f, inside, nodes)
+        to_finish = {n: dist[n] - costs[n] + costs[f]
+                     for n in nodes if n in dist}
+        if s in to_finish or f in from_start:
+            return astar(grid, start, finish)
+
+        abstract = self._abstract_path(s, f, from_start, to_finish)
+        if not abstract:
+            return list()
+
+        path = [start]
+        position = grid.position
+        for a, b in zip(abstract, abstract[1:]):
+            step = astar(grid, position(a), position(b))
+            if not step:
+                return list()
+            path.extend(step[1:])
+        return path
+
+    def _around(self, node):
+        """
+        Return the cells and the abstract nodes of the clusters that node
+        and its neighbors are in.  The first step from a cell on a border
+        may cross it where there is no entrance.
+        """
+        clusters = {self.cluster(node)}
+        clusters.update(self.cluster(other)
+                        for other, cost in self.grid.neighbors(node))
+        inside = set()
+        nodes = set()
+        for cluster in clusters:
+            inside.update(self.cells(cluster))
+            nodes.update(self.cluster_nodes.get(cluster, ()))
+        return inside, nodes
+
+    def _abstract_path(self, s, f, from_start, to_finish):
+        width = self.grid.width
+        step = self.grid.min_cost
+        edges = self.edges
+        fy, fx = divmod(f, width)
+
+        def h(node):
+            y, x = divmod(node, width)
+            dx = abs(x - fx)
+            dy = abs(y - fy)
+            if dx < dy:
+                dx, dy = dy, dx
+            return (dx + (SQRT2 - 1) * dy) * step
+
+        heap = [(h(s), s)]
+        g = {s: 0.0}
+        parent = {s: None}
+        closed = set()
+        while heap:
+            _, node = heappop(heap)
+            if node in closed:
+                continue
+            if node == f:
+                path = list()
+                while node is not None:
+                    path.append(node)
+                    node = parent[node]
+                path.reverse()
+                return path
+            closed.add(node)
+
+            if node == s:
+                # start may be an entrance itself, with edges of its own
+                successors = list(from_start.items())
+                successors.extend(edges.get(s, {}).items())
+            else:
+                successors = list(edges.get(node, {}).items())
+                if node in to_finish:
+                    successors.append((f, to_finish[node]))
+
+            node_g = g[node]
+            for other, cost in successors:
+                _g = node_g + cost
+                if other not in closed and _g < g.get(other, inf):
+                    g[other] = _g
+                    parent[other] = node
+                    heappush(heap, (_g + h(other), other))
+
+        return list()
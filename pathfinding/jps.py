@@ -0,0 +1,167 @@
+"""
+Jump Point Search for grids where every open cell costs the same.
+
+JPS is A* that skips over the cells of straight and diagonal runs that
+cannot lead anywhere a cheaper path could not also reach.  Only "jump
+points" are pushed on the heap, so far fewer nodes are expanded on open
+maps.  Moves follow the same rules as pathfinding.astar: diagonal moves may
+not cut the corner of a blocked cell.
+
+Cells are numbered on the padded wall map from Grid.walls(), so moving one
+step is adding 1 or the padded width, and the border stops every run.
+
+Use pathfinding.astar on grids with varying costs.
+"""
+from heapq import heappush, heappop
+
+from pathfinding.grid import SQRT2
+
+
+def jps(grid, start, finish):
+    """
+    return the cheapest path from start to finish as a list of (x, y)
+    positions, including both ends, or an empty list if there is no path.
+
+    the grid must be uniform (see Grid.uniform).
+    """
+    if start not in grid or finish not in grid or grid.is_blocked(finish):
+        return list()
+
+    walls = grid.walls()
+    row = grid.width + 2
+    step = grid.base_cost
+    gx, gy = finish
+    goal = (gy + 1) * row + gx + 1
+
+    def jump_straight(p, d, side):
+        # walk a straight line until a forced neighbor, the goal, or a wall
+        back = p
+        while 1:
+            p += d
+            if walls[p]:
+                return None
+            if p == goal:
+                return p
+            if (not walls[p + side] and walls[back + side]) or \
+                    (not walls[p - side] and walls[back - side]):
+                return p
+            back = p
+
+    def jump(p, dx, dy):
+        if not dy:
+            return jump_straight(p - dx, dx, row)
+        if not dx:
+            return jump_straight(p - dy, dy, 1)
+
+        # diagonal: stop when either straight line finds something
+        d = dx + dy
+        while 1:
+            if walls[p]:
+                return None
+            if p == goal:
+                return p
+            if jump_straight(p, dx, row) or jump_straight(p, dy, 1):
+                return p
+            if walls[p + dx] or walls[p + dy]:
+                return None
+            p += d
+
+    def directions(p, parent):
+        # dx is -1, 0 or 1; dy is -row, 0 or row
+        if parent is None:
+            yield 1, 0
+            yield -1, 0
+            yield 0, row
+            yield 0, -row
+            for dx in (1, -1):
+                for dy in (row, -row):
+                    if not walls[p + dx] and not walls[p + dy]:
+                        yield dx, dy
+            return
+
+        py, px = divmod(parent, row)
+        y, x = divmod(p, row)
+        dx = (x > px) - (x < px)
+        dy = ((y > py) - (y < py)) * row
+        if dx and dy:
+            yield dx, 0
+            yield 0, dy
+            if not walls[p + dx] and not walls[p + dy]:
+                yield dx, dy
+        elif dx:
+            yield dx, 0
+            yield 0, row
+            yield 0, -row
+            if not walls[p + dx]:
+                if not walls[p + row]:
+                    yield dx, row
+                if not walls[p - row]:
+                    yield dx, -row
+        else:
+            yield 0, dy
+            yield 1, 0
+            yield -1, 0
+            if not walls[p + dy]:
+                if not walls[p + 1]:
+                    yield 1, dy
+                if not walls[p - 1]:
+                    yield -1, dy
+
+    def h(a, b):
+        ay, ax = divmod(a, row)
+        by, bx = divmod(b, row)
+        dx = abs(ax - bx)
+        dy = abs(ay - by)
+        if dx < dy:
+            dx, dy = dy, dx
+        return (dx + (SQRT2 - 1) * dy) * step
+
+    sx, sy = start
+    source = (sy + 1) * row + sx + 1
+    heap = [(h(source, goal), source)]
+    g = {source: 0.0}
+    parent = {source: None}
+    closed = set()
+
+    while heap:
+        f, node = heappop(heap)
+        if node in closed:
+            continue
+        if node == goal:
+            return _path(parent, node, row)
+        closed.add(node)
+        node_g = g[node]
+        for dx, dy in directions(node, parent[node]):
+            point = jump(node + dx + dy, dx, dy)
+            if point is None or point in closed:
+                continue
+            _g = node_g + h(node, point)
+            if _g < g.get(point, _g + 1):
+                g[point] = _g
+                parent[point] = node
+                heappush(heap, (_g + h(point, goal), point))
+
+    return list()
+
+
+def _path(parent, node, row):
+    """
+    expand the jump points into every cell along the way
+    """
+    points = list()
+    while node is not None:
+        y, x = divmod(node, row)
+        points.append((x - 1, y - 1))
+        node = parent[node]
+    points.reverse()
+
+    path = [points[0]]
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        dx = (x1 > x0) - (x1 < x0)
+        dy = (y1 > y0) - (y1 < y0)
+        x, y = x0, y0
+        while (x, y) != (x1, y1):
+            x += dx
+            y += dy
+            path.append((x, y))
+    return path
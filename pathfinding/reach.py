@@ -0,0 +1,122 @@
+"""
+The cells an entity could move to: every open cell within a radius.
+
+A disc is kept as row spans: for each row offset, how far the disc reaches
+to the left and right.  Spans are computed once per radius.  A Reachable set
+cuts one row of Grid.walls() per span and keeps it as a bytes mask, so no
+per-cell objects are made unless the set is iterated.
+"""
+from bisect import bisect
+from functools import lru_cache
+from math import isqrt
+import random
+
+
+# turns a row of walls (1 is blocked) into a row of open cells (1 is open)
+_OPEN = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+
+
+@lru_cache(maxsize=64)
+def disc(radius):
+    """
+    Return ((dy, half width), ...) for a disc of radius.  Cell (dx, dy) is
+    in the disc if dx * dx + dy * dy <= radius * radius.
+    """
+    if radius < 0:
+        return ()
+    r2 = radius * radius
+    reach = int(radius)
+    return tuple((dy, isqrt(int(r2 - dy * dy)))
+                 for dy in range(-reach, reach + 1))
+
+
+class Reachable:
+    """
+    Open cells of a Grid within radius of center.
+
+    rows is a list of (y, left, mask): mask[i] is 1 if (left + i, y) is
+    open and in the disc.  Cells off the map are not included.
+    """
+    __slots__ = ('grid', 'center', 'radius', 'rows', '_counts')
+
+    def __init__(self, grid, center, radius):
+        self.grid = grid
+        self.center = center
+        self.radius = radius
+        self._counts = None
+
+        # deref for speed
+        walls = grid.walls()
+        row = grid.width + 2
+        width = grid.width
+        height = grid.height
+        cx, cy = center
+
+        rows = list()
+        for dy, half in disc(radius):
+            y = cy + dy
+            if y < 0 or y >= height:
+                continue
+            left = max(cx - half, 0)
+            right = min(cx + half, width - 1)
+            if left > right:
+                continue
+            start = (y + 1) * row + left + 1
+            mask = walls[start:start + right - left + 1].translate(_OPEN)
+            rows.append((y, left, bytes(mask)))
+        self.rows = rows
+
+    def __repr__(self):
+        return "<Reachable: {} cells within {} of {}>".format(
+            len(self), self.radius, self.center)
+
+    def __len__(self):
+        return self.counts()[-1] if self.rows else 0
+
+    def __contains__(self, position):
+        x, y = position
+        rows = self.rows
+        if not rows:
+            return False
+        index = y - rows[0][0]
+        if index < 0 or index >= len(rows):
+            return False
+        y, left, mask = rows[index]
+        x -= left
+        return 0 <= x < len(mask) and mask[x] == 1
+
+    def __iter__(self):
+        for y, left, mask in self.rows:
+            for i, value in enumerate(mask):
+                if value:
+                    yield left + i, y
+
+    def counts(self):
+        """
+        Return the running total of open cells, row by row
+        """
+        if self._counts is None:
+            total = 0
+            counts = list()
+            for y, left, mask in self.rows:
+                total += mask.count(1)
+                counts.append(total)
+            self._counts = counts
+        return self._counts
+
+    def sample(self, rng=random):
+        """
+        Return a random reachable cell, or None if there are none
+        """
+        counts = self.counts() if self.rows else ()
+        if not counts or not counts[-1]:
+            return None
+        n = rng.randrange(counts[-1])
+        index = bisect(counts, n)
+        if index:
+            n -= counts[index - 1]
+        y, left, mask = self.rows[index]
+        i = -1
+        for _ in range(n + 1):
+            i = mask.index(1, i + 1)
+        return left + i, y
@@ -1,3 +1,5 @@
+from copy import copy
+
 from . import easing
 
 
@@ -18,7 +20,8 @@ class Action:
     default_duration = 1.0
     default_easing = easing.linear
     provides = list()
-    requires = list()
+    static = False          # get_actions does not depend on memory
+    template = False        # made once and shared by planning nodes
     domain = None
 
     def __init__(self, parent, prereqs=None, effects=None, memory=None,
@@ -38,11 +41,11 @@ class Action:
             self.memory = set()
 
         self._duration = self.default_duration
-        self.easing = self.default_easing
+        self.easing = type(self).default_easing
         self._elapsed_time = 0.0
-        self._progress = 0.0
         self._interval = None
         self._generator = None
+        self._store = None      # ActionProgress keeping time, if running
 
     def __iter__(self):
         return self
@@ -55,6 +58,20 @@ class Action:
     def __repr__(self):
         return '<ActionContext: {}>'.format(self.__class__.__name__)
 
+    def copy(self, parent=None):
+        """
+        Return a copy of this action that has not been started
+        """
+        action = copy(self)
+        if parent is not None:
+            action.parent = parent
+        action._elapsed_time = 0.0
+        action._interval = None
+        action._generator = None
+        action._store = None
+        action.template = False
+        return action
+
     def step(self, dt):
         """
         called by the environment.  do not override.  use update instead.
@@ -63,7 +80,8 @@ class Action:
         """
         self._interval = dt
         self._generator = None
-        self._progress += dt
+        if self._store is None:
+            self._elapsed_time += dt
         return self
 
     def update(self, dt):
@@ -76,17 +94,22 @@ class Action:
         """
         Return a generator of child abilities, or empty list if this can make
         changes to world state
+
+        if the actions never depend on memory, set static = True: the planner
+        will call this once per agent, with memory=None, and reuse the
+        actions (see pygoap.planning.ActionTable).
         """
         return list()
 
-    def pretest(self, memory):
+    def pretest(self, types):
         """
-        Convenience function to pretest a Memory with all prereqs
+        Convenience function to pretest all prereqs
 
-        A pretest is a quicker test that should be called on a Memory delta
+        types is the set of precept types in the memory that would be tested
+        (see PlanningNode.types)
         """
         for prereq in self.prereqs:
-            if not prereq.pretest(memory):
+            if not prereq.pretest(types):
                 return 0.0
 
         return 1.0
@@ -119,11 +142,17 @@ class Action:
 
     @property
     def progress(self):
-        return self.easing(self._elapsed_time / self._duration)
+        if self._store is not None:
+            return self._store.progress(self)
+        if self._duration <= 0:
+            return self.easing(1.0)
+        return self.easing(min(self._elapsed_time / self._duration, 1.0))
 
     @property
     def finished(self):
-        return self.progress >= 1.0
+        if self._store is not None:
+            return self._store.finished(self)
+        return self._elapsed_time >= self._duration or self.progress >= 1.0
 
     @property
     def duration(self):
@@ -131,4 +160,6 @@ class Action:
 
     @property
     def elapsed_teme(self):
+        if self._store is not None:
+            return self._store.elapsed(self)
         return self._elapsed_time
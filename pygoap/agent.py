@@ -1,9 +1,12 @@
+from collections import OrderedDict
+from time import perf_counter
 import logging
-from operator import itemgetter
 
-from pygoap.memory import MemoryManager
+from pygoap.goals import GoalSet
+from pygoap.memory import MemoryManager, OldestFirst
 from pygoap.environment import ObjectBase
-from pygoap.planning import plan
+from pygoap.planning import plan, regress, ActionTable
+from pygoap.planning import PlanSearch, RegressSearch
 from pygoap.precepts import *
 
 
@@ -14,15 +17,25 @@ class GoapAgent(ObjectBase):
     """
     AI Agent
     """
+    plan_cache = None       # set to a PlanCache to reuse plans
+    regressive = False      # plan backward from goals (see planning.regress)
+    plan_budget = None      # nodes planning may expand each tick
+    plan_time = None        # seconds planning may take each tick
+    anytime = False         # out of budget: follow the best partial plan
+    memory_size = MemoryManager.max_size
+    memory_policy = OldestFirst     # called to make the eviction policy
 
     def __init__(self):
         super().__init__()
-        self.memory = MemoryManager()
-        self.delta = MemoryManager()
-        self.goals = set()          # all goals this instance can use
+        self.memory = MemoryManager(max_size=self.memory_size,
+                                    policy=self.memory_policy())
+        self.delta = OrderedDict()  # precepts not in memory yet, in order
+        self.goals = GoalSet()      # all goals this instance can use
         self.abilities = set()      # all actions this agent can perform
         self.filters = list()       # list of methods to use as a filter
         self.plan = list()          # list of actions to perform
+        self.action_table = ActionTable(self)   # actions of static abilities
+        self.search = None          # PlanSearch to resume next tick
 
     def __repr__(self):
         return "<Agent: {}>".format(self.name)
@@ -33,6 +46,10 @@ class GoapAgent(ObjectBase):
         this can be used to simulate errors in judgement by the agent dropping
         the precept, or maybe a condition or limitation of the agent
         """
+        if not self.filters:
+            yield precept
+            return
+
         for f in self.filters:
             for p in f(self, precept):
                 yield p
@@ -44,8 +61,16 @@ class GoapAgent(ObjectBase):
         if not isinstance(precepts, (tuple, list, set)):
             precepts = [precepts]
 
+        if self.filters:
+            for precept in precepts:
+                self.process(precept)
+            return
+
+        # without filters every precept is kept
+        # deref for speed
+        learn = self._learn
         for precept in precepts:
-            self.process(precept)
+            learn(precept)
 
     def process(self, precept):
         """
@@ -53,41 +78,163 @@ class GoapAgent(ObjectBase):
         """
         for this_precept in self.filter_precept(precept):
             debug("[agent] %s recv'd precept %s", self, this_precept)
-            if not isinstance(precept, TimePrecept):
-                self.delta.add(precept)
+            self._learn(this_precept)
+
+    def _learn(self, precept):
+        """
+        remember a precept that made it through the filters
+        """
+        if not isinstance(precept, TimePrecept):
+            self.delta[precept] = None
+            if self.plan_cache is not None:
+                self.plan_cache.invalidate(type(precept))
+
+    @property
+    def needs_plan(self):
+        return len(self.plan) == 0
 
     def plan_if_needed(self):
-        if len(self.plan) == 0:
+        if self.needs_plan:
             self.find_plan()
 
     def find_plan(self):
         """
         force agent to re-evaluate goals and to formulate a plan
         """
-        # get the relevancy of each goal according to the state of the agent
-        # filter out goals that are not relevant (==0)
-        # sort goals so that highest relevancy are first
-        s = sorted(((g.get_relevancy(self.memory), g) for g in self.goals),
-                   reverse=True, key=itemgetter(0))
-        s = [i for i in s if i[0] > 0]
+        return self.apply_plan(self.formulate_plan())
+
+    def formulate_plan(self):
+        """
+        re-evaluate goals and return a plan without changing the agent
 
-        debug("[agent] %s has goals %s", self, s)
+        this only reads the agent (and the scores its goals keep, and the
+        search it suspends), so the planning of many agents can be done at
+        the same time.  use apply_plan to give the plan to the agent.
 
-        start_action = None
-        self.plan = list()
-        for score, goal in s:
-            tentative = plan(goal, self, start_action, self.abilities,
-                             self.delta)
+        if plan_budget or plan_time is set, see bounded_plan.
+        """
+        # goals that are relevant (> 0), highest relevancy first.  only
+        # goals whose precepts changed since the last plan are scored again.
+        s = self.goals.ranked(self.memory)
+        if self.plan_budget is not None or self.plan_time is not None:
+            return self.bounded_plan(s)
 
+        for score, goal in s:
+            debug("[agent] %s trying goal %s (%s)", self, goal, score)
+            search = regress if self.is_regressive(goal) else plan
+            tentative = self._plan_for(goal, search)
             if tentative:
                 tentative.pop(-1)
-                self.plan = tentative
                 debug("[agent] %s has planned to %s", self, goal)
-                debug("[agent] %s has plan %s", self, self.plan)
-                break
+                debug("[agent] %s has plan %s", self, tentative)
+                return tentative
+
+        return list()
+
+    def is_regressive(self, goal):
+        """
+        True if plans for goal are searched backward, with regress
+        """
+        if goal.regressive is None:
+            return self.regressive
+        return goal.regressive
 
-        self.memory.update(self.delta)
-        self.delta.clear()
+    def _plan_for(self, goal, search):
+        """
+        return search's plan for goal from what the agent knows, using the
+        plan cache if there is one
+        """
+        if self.plan_cache is None:
+            return search(goal, self, None, self.abilities, self.delta)
+        return self.plan_cache.plan(goal, self, None, self.abilities,
+                                    self.delta, search)
+
+    def bounded_plan(self, ranked):
+        """
+        plan for the goals in ranked, (score, goal) pairs, within
+        plan_budget nodes and plan_time seconds.  regressive goals are
+        searched backward, as regress does.
+
+        when planning runs out, the search is kept in self.search and goes on
+        from where it stopped the next time, unless the agent has learned
+        something since; the agent has no plan until then.  if anytime is
+        set, the agent follows the best partial plan instead.
+        """
+        search = self.search
+        self.search = None
+        if search is not None and (self.delta or
+                                   search.goal not in self.goals):
+            # the search started from what the agent knew then
+            search = None
+
+        left = self.plan_budget
+        deadline = None
+        if self.plan_time is not None:
+            deadline = perf_counter() + self.plan_time
+
+        tried = set()
+        if search is not None:
+            tried.add(search.goal)
+        goals = (goal for score, goal in ranked)
+        while 1:
+            if search is None:
+                goal = next(goals, None)
+                if goal is None:
+                    return list()
+                if goal in tried:
+                    continue
+                tried.add(goal)
+                if self.is_regressive(goal):
+                    search = RegressSearch(goal, self, None, self.abilities,
+                                           self.delta)
+                else:
+                    search = PlanSearch(goal, self, None, self.abilities,
+                                        self.delta)
+
+            expanded = search.stats.expanded
+            remaining = None
+            if deadline is not None:
+                remaining = max(deadline - perf_counter(), 0.0)
+            tentative = search.run(left, remaining)
+            if left is not None:
+                left -= search.stats.expanded - expanded
+
+            if tentative is None:
+                if self.anytime:
+                    tentative = search.best()
+                    tentative.pop(-1)
+                    debug("[agent] %s ran out, has partial plan %s", self,
+                          tentative)
+                    return tentative
+                debug("[agent] %s will keep planning for %s", self,
+                      search.goal)
+                self.search = search
+                return list()
+
+            if tentative:
+                tentative.pop(-1)
+                debug("[agent] %s has planned to %s", self, search.goal)
+                return tentative
+            search = None
+
+    def apply_plan(self, new_plan):
+        """
+        follow a plan from formulate_plan and remember the new precepts
+        """
+        self.plan = new_plan
+        environment = getattr(self, 'environment', None)
+        if environment is not None:
+            environment.start_plan(self)
+        memory = self.memory
+        delta = self.delta
+        grown = len(memory) + sum(1 for p in delta if p not in memory)
+        memory.update(delta)
+        if len(memory) < grown:
+            # precepts were forgotten to make room
+            self.goals.changed()
+        else:
+            self.goals.changed(delta)
+        delta.clear()
 
         return self.plan
 
@@ -0,0 +1,257 @@
+"""
+Batch versions of the functions in pygoap.easing.
+
+Each function takes a sequence of progress values, each in the range 0-1,
+and returns the eased values.  If NumPy is installed, the functions work on
+whole arrays at once and return arrays; otherwise they call the function in
+pygoap.easing for each value and return a list.
+
+batch(func) returns the batch version of an easing function, so callers can
+keep the scalar function on an action and look up its counterpart.
+"""
+from math import pi
+
+from . import easing
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_names = ['linear',
+          'in_quad', 'out_quad', 'in_out_quad',
+          'in_cubic', 'out_cubic', 'in_out_cubic',
+          'in_quart', 'out_quart', 'in_out_quart',
+          'in_quint', 'out_quint', 'in_out_quint',
+          'in_sine', 'out_sine', 'in_out_sine',
+          'in_expo', 'out_expo', 'in_out_expo',
+          'in_circ', 'out_circ', 'in_out_circ',
+          'in_elastic', 'out_elastic', 'in_out_elastic',
+          'in_back', 'out_back', 'in_out_back',
+          'in_bounce', 'out_bounce', 'in_out_bounce']
+
+__all__ = _names + ['batch']
+
+
+def _array(progress):
+    return np.asarray(progress, dtype=float)
+
+
+def linear(progress):
+    return np.array(progress, dtype=float)
+
+
+def in_quad(progress):
+    p = _array(progress)
+    return p * p
+
+
+def out_quad(progress):
+    p = _array(progress)
+    return -1.0 * p * (p - 2.0)
+
+
+def in_out_quad(progress):
+    p = _array(progress) * 2
+    q = p - 1.0
+    return np.where(p < 1, 0.5 * p * p, -0.5 * (q * (q - 2.0) - 1.0))
+
+
+def in_cubic(progress):
+    p = _array(progress)
+    return p * p * p
+
+
+def out_cubic(progress):
+    p = _array(progress) - 1.0
+    return p * p * p + 1.0
+
+
+def in_out_cubic(progress):
+    p = _array(progress) * 2
+    q = p - 2
+    return np.where(p < 1, 0.5 * p * p * p, 0.5 * (q * q * q + 2.0))
+
+
+def in_quart(progress):
+    p = _array(progress)
+    return p * p * p * p
+
+
+def out_quart(progress):
+    p = _array(progress) - 1.0
+    return -1.0 * (p * p * p * p - 1.0)
+
+
+def in_out_quart(progress):
+    p = _array(progress) * 2
+    q = p - 2
+    return np.where(p < 1, 0.5 * p * p * p * p,
+                    -0.5 * (q * q * q * q - 2.0))
+
+
+def in_quint(progress):
+    p = _array(progress)
+    return p * p * p * p * p
+
+
+def out_quint(progress):
+    p = _array(progress) - 1.0
+    return p * p * p * p * p + 1.0
+
+
+def in_out_quint(progress):
+    p = _array(progress) * 2
+    q = p - 2.0
+    return np.where(p < 1, 0.5 * p * p * p * p * p,
+                    0.5 * (q * q * q * q * q + 2.0))
+
+
+def in_sine(progress):
+    return -1.0 * np.cos(_array(progress) * (pi / 2.0)) + 1.0
+
+
+def out_sine(progress):
+    return np.sin(_array(progress) * (pi / 2.0))
+
+
+def in_out_sine(progress):
+    return -0.5 * (np.cos(pi * _array(progress)) - 1.0)
+
+
+def in_expo(progress):
+    p = _array(progress)
+    return np.where(p == 0, 0.0, np.power(2.0, 10 * (p - 1.0)))
+
+
+def out_expo(progress):
+    p = _array(progress)
+    return np.where(p == 1.0, 1.0, -np.power(2.0, -10 * p) + 1.0)
+
+
+def in_out_expo(progress):
+    p = _array(progress)
+    q = p * 2
+    eased = np.where(q < 1, 0.5 * np.power(2.0, 10 * (q - 1.0)),
+                     0.5 * (-np.power(2.0, -10 * (q - 1.0)) + 2.0))
+    return np.where(p == 0, 0.0, np.where(p == 1.0, 1.0, eased))
+
+
+def in_circ(progress):
+    p = _array(progress)
+    return -1.0 * (np.sqrt(1.0 - p * p) - 1.0)
+
+
+def out_circ(progress):
+    p = _array(progress) - 1.0
+    return np.sqrt(1.0 - p * p)
+
+
+def in_out_circ(progress):
+    p = _array(progress) * 2
+    q = p - 2.0
+    # each branch is computed for every value; ignore the square roots of
+    # negative numbers in the branch that is not used
+    with np.errstate(invalid='ignore'):
+        return np.where(p < 1, -0.5 * (np.sqrt(1.0 - p * p) - 1.0),
+                        0.5 * (np.sqrt(1.0 - q * q) + 1.0))
+
+
+def in_elastic(progress):
+    period = .3
+    s = period / 4.0
+    p = _array(progress)
+    q = p - 1.0
+    return np.where(p == 1, 1.0, -(np.power(2.0, 10 * q) *
+                                   np.sin((q - s) * (2 * pi) / period)))
+
+
+def out_elastic(progress):
+    period = .3
+    s = period / 4.0
+    p = _array(progress)
+    return np.where(p == 1, 1.0, np.power(2.0, -10 * p) *
+                    np.sin((p - s) * (2 * pi) / period) + 1.0)
+
+
+def in_out_elastic(progress):
+    period = .3 * 1.5
+    s = period / 4.0
+    p = _array(progress) * 2
+    q = p - 1.0
+    wave = np.sin((q - s) * (2.0 * pi) / period)
+    eased = np.where(p < 1, -.5 * (np.power(2.0, 10 * q) * wave),
+                     np.power(2.0, -10 * q) * wave * .5 + 1.0)
+    return np.where(p == 2, 1.0, eased)
+
+
+def in_back(progress):
+    p = _array(progress)
+    return p * p * ((1.70158 + 1.0) * p - 1.70158)
+
+
+def out_back(progress):
+    p = _array(progress) - 1.0
+    return p * p * ((1.70158 + 1) * p + 1.70158) + 1.0
+
+
+def in_out_back(progress):
+    p = _array(progress) * 2.
+    s = 1.70158 * 1.525
+    q = p - 2.0
+    return np.where(p < 1, 0.5 * (p * p * ((s + 1.0) * p - s)),
+                    0.5 * (q * q * ((s + 1.0) * q + s) + 2.0))
+
+
+def _out_bounce(p):
+    return np.select(
+        (p < (1.0 / 2.75), p < (2.0 / 2.75), p < (2.5 / 2.75)),
+        (7.5625 * p * p,
+         7.5625 * (p - 1.5 / 2.75) ** 2 + .75,
+         7.5625 * (p - 2.25 / 2.75) ** 2 + .9375),
+        7.5625 * (p - 2.625 / 2.75) ** 2 + .984375)
+
+
+def in_bounce(progress):
+    return 1.0 - _out_bounce(1.0 - _array(progress))
+
+
+def out_bounce(progress):
+    return _out_bounce(_array(progress))
+
+
+def in_out_bounce(progress):
+    p = _array(progress) * 2.
+    return np.where(p < 1., (1.0 - _out_bounce(1.0 - p)) * .5,
+                    _out_bounce(p - 1.) * .5 + .5)
+
+
+def _mapped(func):
+    """
+    Batch version of func that calls it once for each value
+    """
+    def batch(progress):
+        return [func(p) for p in progress]
+
+    batch.__name__ = func.__name__
+    batch.__doc__ = func.__doc__
+    return batch
+
+
+if np is None:
+    for _name in _names:
+        globals()[_name] = _mapped(getattr(easing, _name))
+
+_batches = {getattr(easing, name): globals()[name] for name in _names}
+
+
+def batch(func):
+    """
+    Return the batch version of an easing function.  Functions that are not
+    in pygoap.easing are called once for each value.
+    """
+    try:
+        return _batches[func]
+    except KeyError:
+        return _batches.setdefault(func, _mapped(func))
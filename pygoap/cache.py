@@ -0,0 +1,160 @@
+"""
+Agents in a simulation often face the same goal with the same facts, tick
+after tick.  A PlanCache remembers the plans (and failures) the planner found
+so the search is not repeated.
+
+Plans are keyed by the goal, the start action, the set of abilities, the
+slice of memory that the goal and the abilities' actions read, and the search
+function.  The slice is made of the precepts whose types are in
+goal.required_types or are tested by the prereqs of the actions.  Only the
+actions of static abilities are known before planning, so if any ability is
+not static, or has an action with a prereq that is not a PreceptGoal, the
+whole memory is used for the key.
+
+A cache belongs to one agent:
+
+    agent.plan_cache = PlanCache(256)
+
+The keys hold the agent's own goal and ability objects, so a cache set on a
+class and shared by its agents would only hit for goals and abilities that
+the agents share as objects.
+"""
+from collections import OrderedDict, defaultdict
+from threading import Lock
+import logging
+
+from pygoap.planning import plan, action_table, ActionTable
+
+
+debug = logging.debug
+
+
+class PlanCache:
+    """
+    LRU cache of plans
+    """
+
+    def __init__(self, size=128):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._plans = OrderedDict()
+        self._keys_by_type = defaultdict(set)
+        # agents may plan in threads and share a cache
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._plans)
+
+    def __repr__(self):
+        return "<PlanCache: {}/{}, hits: {}, misses: {}, evictions: {}>" \
+            .format(len(self), self.size, self.hits, self.misses,
+                    self.evictions)
+
+    @staticmethod
+    def relevant_types(goal, abilities, table):
+        """
+        Return the precept types read by the goal and the prereqs of the
+        abilities' actions, or None if they are not all known
+        """
+        types = set(goal.required_types)
+        for ability in abilities:
+            if not ability.static:
+                return None
+            entries = table.effects(ability, None)
+            if len(entries) < len(table.actions(ability, None)):
+                return None
+            for action, provides, needs in entries:
+                types.update(type(p) for p in needs)
+        return frozenset(types)
+
+    def make_key(self, goal, start_action, abilities, memory, search=plan,
+                 table=None):
+        """
+        Return the key for a plan and the precept types it depends on.
+        table is the ActionTable of the planning agent.
+        """
+        if table is None:
+            table = ActionTable(None)
+        types = self.relevant_types(goal, abilities, table)
+        if types is None:
+            memory_slice = frozenset(memory)
+        else:
+            memory_slice = frozenset(p for p in memory if type(p) in types)
+        key = (goal, start_action, frozenset(abilities), memory_slice, search)
+        return key, types
+
+    def plan(self, goal, agent, start_action, abilities, start_memory,
+             search=plan):
+        """
+        Same as pygoap.planning.plan, but use the cache.  search is the
+        function that makes plans the cache does not have (plan or regress).
+        """
+        key, types = self.make_key(goal, start_action, abilities,
+                                   start_memory, search, action_table(agent))
+        with self._lock:
+            try:
+                path = self._plans[key][0]
+            except KeyError:
+                path = None
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._plans.move_to_end(key)
+                debug("[cache] hit for %s", goal)
+
+        if path is None:
+            path = search(goal, agent, start_action, abilities,
+                          start_memory)
+            with self._lock:
+                self.store(key, types, path)
+
+        return [[None if action is None else action.copy(agent)
+                 for action in step] for step in path]
+
+    def store(self, key, types, path):
+        """
+        Remember a plan.  Caller must hold the lock.
+        """
+        self._plans[key] = path, types
+        if types is None:
+            types = (None, )
+        for t in types:
+            self._keys_by_type[t].add(key)
+
+        while len(self._plans) > self.size:
+            key, (path, types) = self._plans.popitem(last=False)
+            self._forget(key, types)
+            self.evictions += 1
+
+    def invalidate(self, precept_type):
+        """
+        Drop plans that depend on precepts of this type.  Plans keyed on the
+        whole memory are dropped for any type; a new precept changes the
+        memory, so their keys could not match again.
+        """
+        with self._lock:
+            keys = self._keys_by_type.pop(precept_type, set())
+            keys.update(self._keys_by_type.pop(None, ()))
+            for key in keys:
+                try:
+                    path, types = self._plans.pop(key)
+                except KeyError:
+                    continue
+                self._forget(key, types)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self._keys_by_type.clear()
+
+    def _forget(self, key, types):
+        if types is None:
+            types = (None, )
+        for t in types:
+            keys = self._keys_by_type.get(t)
+            if keys is not None:
+                keys.discard(key)
@@ -8,11 +8,14 @@ environment simply provides enough basic information to the agents to work.  It
 is up to you to make it useful.
 """
 
-from itertools import chain
+from collections import defaultdict
+from heapq import heappush, heappop
+from itertools import chain, count
+from threading import Lock
 import logging
-import queue
 
 from pygoap.precepts import *
+from pygoap.progress import ActionProgress, EPSILON
 
 
 debug = logging.debug
@@ -37,24 +40,99 @@ class ObjectBase:
         return "<Object: {}>".format(self.name)
 
 
+class Event:
+    """
+    callback scheduled with Environment.call_later
+    """
+    __slots__ = ('time', 'callback', 'args')
+
+    def __init__(self, time, callback, args):
+        self.time = time
+        self.callback = callback
+        self.args = args
+
+    def __repr__(self):
+        return "<Event: {} at {}>".format(self.callback, self.time)
+
+    @property
+    def cancelled(self):
+        return self.callback is None
+
+    def cancel(self):
+        self.callback = None
+        self.args = None
+
+
 class Environment:
     """
     Abstract class representing an Environment.
     'Real' Environment classes inherit from this
+
+    The environment keeps simulated time.  Call update(dt) to tick it, or
+    run() to jump from one event to the next (see run).
     """
+    # when running events, actions that make precepts while running are
+    # stepped at least this often
+    active_step = 1.0
 
     def __init__(self):
         self.time = 0
         self._agents = list()
         self._entities = list()
         self._positions = dict()
-        self._action_queue = queue.Queue()
-        self._precept_queue = queue.Queue()
+        self._actions = list()
+        self._precepts = list()
+        self.progress = ActionProgress()
+
+        # callbacks waiting for a time; (time, counter, event)
+        self._events = list()
+        self._event_counter = count()
+        self._jumping = False
+        self._plans_done = False    # an agent needs to plan again now
+
+        # only used when an executor is set
+        self._lock = None
+        self._executor = None
+
+        # interest management; agents that never subscribe get everything
+        self._subscribed = set()
+        self._subscribed_types = defaultdict(set)
+        self._subscribed_entities = defaultdict(set)
+
+        # precepts given to agents (and withheld from them) this tick
+        self.precepts_delivered = 0
+        self.precepts_dropped = 0
+
+        # agents that searched for a plan this tick
+        self.plans_made = 0
 
     @property
     def agents(self):
         return iter(self._agents)
 
+    @property
+    def executor(self):
+        """
+        set to a concurrent.futures.Executor to plan agents concurrently.
+        while an executor is set, posting precepts is thread safe.
+        """
+        return self._executor
+
+    @executor.setter
+    def executor(self, executor):
+        self._executor = executor
+        self._lock = None if executor is None else Lock()
+
+    def post_precept(self, precept):
+        """
+        queue a precept to be broadcast at the start of the next tick
+        """
+        if self._lock is None:
+            self._precepts.append(precept)
+        else:
+            with self._lock:
+                self._precepts.append(precept)
+
     @property
     def entities(self):
         return chain(self._entities, self._agents)
@@ -83,7 +161,9 @@ class Environment:
             self._positions[entity] = (None, (0, 0))
 
             # let the planner know who the memory belongs to
-            entity.process(DatumPrecept(entity, 'name', entity.name))
+            precept = DatumPrecept(entity, 'name', entity.name)
+            entity.memory.pin(precept)
+            entity.process(precept)
         else:
             self._entities.append(entity)
 
@@ -98,32 +178,204 @@ class Environment:
         """
         # update time in the simulation
         self.time += dt
+        self._plans_done = False
+        self.precepts_delivered = 0
+        self.precepts_dropped = 0
+        self.plans_made = 0
 
         # let all the agents know that time has passed
-        self._precept_queue.put(TimePrecept(self.time))
+        self.post_precept(TimePrecept(self.time))
 
+        self.handle_events()
         self.handle_precepts()
+        self.handle_planning()
+        self.handle_actions(dt)
 
-        action_put = self._action_queue.put
-        for agent in self.agents:
-            agent.plan_if_needed()
-            for action in agent.running_actions:
-                action_put(action)
+    def call_later(self, delay, callback, *args):
+        """
+        call callback(*args) after delay units of simulated time.  like
+        asyncio's loop.call_later, so organs and timers can use either.
 
-        self.handle_actions(dt)
+        return an Event that can be cancelled.
+        """
+        return self.call_at(self.time + delay, callback, *args)
+
+    def call_at(self, when, callback, *args):
+        """
+        call callback(*args) when the simulated time reaches when
+        """
+        event = Event(when, callback, args)
+        heappush(self._events, (when, next(self._event_counter), event))
+        return event
+
+    def handle_events(self):
+        """
+        call the callbacks that are due, in the order they are due.
+        callbacks may schedule more events; those that are due now are
+        called too.
+        """
+        events = self._events
+        limit = self.time + EPSILON
+        while events and events[0][0] <= limit:
+            when, i, event = heappop(events)
+            callback = event.callback
+            if callback is not None:
+                event.callback = None
+                callback(*event.args)
+
+    def next_event(self):
+        """
+        return the time of the next thing that will happen: a scheduled
+        event, a running action finishing, or an agent that finished its
+        plan making a new one.  None if nothing will.
+        """
+        if self._plans_done:
+            return self.time
+
+        events = self._events
+        while events and events[0][2].callback is None:
+            heappop(events)
+
+        times = [events[0][0]] if events else []
+        finish = self.progress.next_time()
+        if finish is not None:
+            times.append(finish)
+        if self.progress.active:
+            times.append(self.time + self.active_step)
+        return min(times) if times else None
+
+    def run(self, until=None):
+        """
+        run the simulation as discrete events instead of fixed ticks
+
+        time jumps straight to the next event (see next_event).  precepts,
+        planning and actions are only handled when something can have
+        changed: an action finished, an action is making precepts, an agent
+        needs a new plan, or a callback posted precepts.  otherwise only the
+        events are called.  agents do not learn from TimePrecepts, so
+        nothing is missed.
+
+        stop when nothing more is scheduled, or at time until.  return the
+        number of updates that were done.
+        """
+        self._jumping = True
+        try:
+            updates = self._run(until)
+        finally:
+            self._jumping = False
+
+        if until is not None and self.time < until:
+            self.progress.advance(until - self.time)
+            self.time = until
+        return updates
+
+    def _run(self, until):
+        # let agents without plans plan, and start their actions
+        self.update(0)
+        updates = 1
+
+        # deref for speed
+        progress = self.progress
+        next_event = self.next_event
+        handle_events = self.handle_events
+
+        while 1:
+            when = next_event()
+            if when is None or (until is not None and when > until):
+                return updates
+            finish = progress.next_time()
+            if self._plans_done or progress.active or \
+                    (finish is not None and finish <= when + EPSILON):
+                self.update(when - self.time)
+                updates += 1
+                continue
+
+            # only events are due; skip the rest of the update unless the
+            # callbacks posted something
+            progress.advance(when - self.time)
+            self.time = when
+            handle_events()
+            if self._precepts:
+                self.update(0)
+                updates += 1
+
+    def handle_planning(self):
+        """
+        let every agent without a plan make one
+
+        if self.executor is set, the agents plan concurrently and the plans
+        are given to the agents in the order the agents were added, so the
+        results do not depend on which search finishes first.
+
+        planning jobs share the agents with this process, so use an executor
+        that runs in this process (such as a ThreadPoolExecutor; searches run
+        in parallel on free-threaded builds of python).
+        """
+        agents = [agent for agent in self._agents if agent.needs_plan]
+        self.plans_made += len(agents)
+
+        if self.executor is None or len(agents) < 2:
+            for agent in agents:
+                agent.find_plan()
+        else:
+            submit = self.executor.submit
+            futures = [submit(agent.formulate_plan) for agent in agents]
+            for agent, future in zip(agents, futures):
+                agent.apply_plan(future.result())
+
+        # agents that ran out of planning budget go on next tick
+        for agent in agents:
+            if getattr(agent, 'search', None) is not None:
+                self._plans_done = True
 
     def handle_precepts(self):
         """
         process all of the precepts in the queue
         """
-        l = set()
-        get_precept = self._precept_queue.get
-        while 1:
-            try:
-                l.add(get_precept(False))
-            except queue.Empty:
-                self.broadcast_precepts(l)
-                break
+        if self._lock is None:
+            precepts, self._precepts = self._precepts, list()
+        else:
+            with self._lock:
+                precepts, self._precepts = self._precepts, list()
+
+        self.broadcast_precepts(set(precepts))
+
+    def subscribe(self, agent, types=(), entities=()):
+        """
+        Only send the agent precepts of these types or about these entities.
+
+        Subscriptions add up.  Agents that have not subscribed receive every
+        precept.
+        """
+        self._subscribed.add(agent)
+        for t in types:
+            self._subscribed_types[t].add(agent)
+        for entity in entities:
+            self._subscribed_entities[entity].add(agent)
+
+    def unsubscribe(self, agent):
+        """
+        Remove the agent's subscriptions, so it receives every precept again.
+        """
+        self._subscribed.discard(agent)
+        for index in (self._subscribed_types, self._subscribed_entities):
+            for key in [k for k, agents in index.items() if agent in agents]:
+                index[key].discard(agent)
+                if not index[key]:
+                    del index[key]
+
+    def interested(self, precept):
+        """
+        Return the set of subscribed agents that want this precept.
+        """
+        agents = set(self._subscribed_types.get(type(precept), ()))
+        try:
+            entity = precept.entity
+        except AttributeError:
+            return agents
+
+        agents.update(self._subscribed_entities.get(entity, ()))
+        return agents
 
     def broadcast_precepts(self, precepts):
         """
@@ -134,48 +386,73 @@ class Environment:
         for p in precepts:
             self.broadcast_hook(p)
 
+        inbox = dict()
+        if self._subscribed:
+            inbox = {agent: list() for agent in self._subscribed}
+            for p in precepts:
+                for agent in self.interested(p):
+                    inbox[agent].append(p)
+
+        delivered = 0
         for agent in self._agents:
-            agent.process_list(model_precepts(precepts, agent))
+            received = inbox.get(agent, precepts)
+            delivered += len(received)
+            agent.process_list(model_precepts(received, agent))
+
+        self.precepts_delivered += delivered
+        self.precepts_dropped += len(precepts) * len(self._agents) - delivered
+
+    def start_plan(self, agent):
+        """
+        queue the first actions of the agent's new plan.  agents call this
+        when they are given a plan; handle_actions starts the actions after
+        them.
+        """
+        self._actions.extend(agent.running_actions)
 
     def handle_actions(self, dt):
         """
-        process all of the actions in the queue
+        process the actions that run or finish this tick
 
-        eventually create thread pool to do this
+        actions are scheduled by the time they finish (see ActionProgress).
+        each tick, only actions that make precepts while running are stepped,
+        and only actions that finish are looked at.  when an action finishes,
+        the next actions of its agent's plan are started in the same tick.
         """
-        next_queue = queue.Queue()
-        touched = set()
+        progress = self.progress
+        for action in self._actions:
+            progress.add(action)
+        self._actions = list()
 
         # deref for speed
-        action_get = self._action_queue.get
-        action_put = self._action_queue.put
-        precept_put = self._precept_queue.put
-        while 1:
-            try:
-                action = action_get(False)
-
-            except queue.Empty:
-                self._action_queue = next_queue
-                break
-
-            else:
-                if action in touched:
-                    continue
-
-                touched.add(action)
-
-                for precept in action.step(dt):
-                    if precept:
-                        precept_put(precept)
-
-                if action.finished:
-                    action.touch()
-                    action.parent.next_action()
-                    for _action in action.parent.running_actions:
-                        action_put(_action)
-
-                else:
-                    next_queue.put(action)
+        if self._lock is None:
+            precept_put = self._precepts.append
+        else:
+            precept_put = self.post_precept
+
+        lag = 0.0 if self._jumping else dt
+        for action in progress.active:
+            for precept in action.step(dt):
+                if precept:
+                    precept_put(precept)
+
+        finished = progress.advance(dt)
+        while finished:
+            for action in finished:
+                action.touch()
+                action.parent.next_action()
+                if action.parent.needs_plan:
+                    self._plans_done = True
+                for next_action in action.parent.running_actions:
+                    if next_action in progress:
+                        continue
+                    # started this tick, so it has had this tick's time.
+                    # when running events, the tick ends as it finishes.
+                    progress.add(next_action, progress.time - lag)
+                    for precept in next_action.step(dt):
+                        if precept:
+                            precept_put(precept)
+            finished = progress.due()
 
     def model_action(self, action):
         """
@@ -9,12 +9,20 @@ environment simply provides enough basic information to the agents to work.  It
 is up to you to make it useful.
 """
 
+from collections import OrderedDict
 import random
 import math
 
 from pygoap.environment import Environment
 from pygoap.precepts import *
-from pathfinding.astar import search
+from pathfinding.astar import astar
+from pathfinding.cache import PathCache
+from pathfinding.dstar import DStarLite
+from pathfinding.flowfield import FlowField
+from pathfinding.grid import Grid
+from pathfinding.hpa import HierarchicalMap
+from pathfinding.jps import jps
+from pathfinding.reach import Reachable
 
 
 def distance(a, b):
@@ -37,6 +45,102 @@ def clip(vector, lowest, highest):
     raise NotImplementedError
 
 
+class SpatialHash:
+    """
+    Uniform grid of buckets used to find entities near a point.
+
+    Each entity is stored in the bucket for the cell containing its position.
+    Queries only visit the cells that overlap the query area.
+    """
+
+    def __init__(self, cell_size=8):
+        self.cell_size = cell_size
+        self._cells = dict()
+        self._positions = dict()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def cell(self, position):
+        size = self.cell_size
+        return int(position[0] // size), int(position[1] // size)
+
+    def move(self, entity, position):
+        """
+        Add an entity, or move one that is already in the grid.
+        """
+        try:
+            old = self._positions[entity]
+        except KeyError:
+            pass
+        else:
+            old_cell = self.cell(old)
+            if old_cell == self.cell(position):
+                self._positions[entity] = position
+                return
+            self._remove_from(old_cell, entity)
+
+        self._positions[entity] = position
+        try:
+            self._cells[self.cell(position)].add(entity)
+        except KeyError:
+            self._cells[self.cell(position)] = {entity}
+
+    def remove(self, entity):
+        position = self._positions.pop(entity)
+        self._remove_from(self.cell(position), entity)
+
+    def _remove_from(self, cell, entity):
+        bucket = self._cells[cell]
+        bucket.discard(entity)
+        if not bucket:
+            del self._cells[cell]
+
+    def at(self, position):
+        """
+        Return all entities exactly at a position.
+        """
+        bucket = self._cells.get(self.cell(position), ())
+        positions = self._positions
+        return [e for e in bucket if positions[e] == position]
+
+    def in_rect(self, left, top, right, bottom):
+        """
+        Return all entities with left <= x <= right and top <= y <= bottom.
+        """
+        size = self.cell_size
+        cells = self._cells
+        positions = self._positions
+        result = list()
+        for cx in range(int(left // size), int(right // size) + 1):
+            for cy in range(int(top // size), int(bottom // size) + 1):
+                for e in cells.get((cx, cy), ()):
+                    x, y = positions[e]
+                    if left <= x <= right and top <= y <= bottom:
+                        result.append(e)
+        return result
+
+    def in_radius(self, position, radius):
+        """
+        Return all entities within radius of position.
+        """
+        size = self.cell_size
+        cells = self._cells
+        positions = self._positions
+        px, py = position
+        radius2 = radius * radius
+        result = list()
+        for cx in range(int((px - radius) // size),
+                        int((px + radius) // size) + 1):
+            for cy in range(int((py - radius) // size),
+                            int((py + radius) // size) + 1):
+                for e in cells.get((cx, cy), ()):
+                    x, y = positions[e]
+                    if (x - px) ** 2 + (y - py) ** 2 <= radius2:
+                        result.append(e)
+        return result
+
+
 class Pathfinding2D:
     @staticmethod
     def get_surrounding(position):
@@ -70,23 +174,87 @@ class Environment2D(Environment, Pathfinding2D):
     """Environments on a 2D plane.
 
     This class is featured enough to run a simple simulation.
+
+    Positions are (x, y) tuples.  Entities are also kept in a SpatialHash,
+    so looking and searching for nearby objects only checks nearby cells.
+    Obstacles and movement costs are kept on self.grid.
     """
-    def __init__(self, width=10, height=10):
+    vision_radius = 10
+    hierarchical_size = 128 * 128   # maps this big use HPA* to pathfind
+    path_cache_size = 1024
+    flow_field_requests = 8     # paths to one goal before it gets a field
+    flow_field_count = 8        # most flow fields kept at once
+
+    def __init__(self, width=10, height=10, cell_size=8):
         super().__init__()
         self._positions = dict()
+        self._spatial = SpatialHash(cell_size)
+        self._ranges = dict()
+        self._max_range = 0
         self.width = width
         self.height = height
+        self.grid = Grid(width, height)
+        self._hpa = None
+        self.path_cache = PathCache(self._search, self.path_cache_size)
+        self._fields = OrderedDict()
+        self._requests = dict()
 
     def add(self, entity, position=None):
         super().add(entity)
-        self.set_position(entity, self.default_position())
+        if position is None:
+            position = self.default_position()
+        self.set_position(entity, position)
 
     def set_position(self, entity, position):
+        # positions used to be stored as (environment, (x, y))
+        if position[0] is self:
+            position = position[1]
         self._positions[entity] = position
+        self._spatial.move(entity, position)
 
     def get_position(self, entity):
         return self._positions[entity]
 
+    def subscribe(self, agent, types=(), entities=(), radius=None):
+        """
+        Same as Environment.subscribe, and also send the agent precepts about
+        entities within radius of the agent.
+        """
+        super().subscribe(agent, types, entities)
+        if radius is not None:
+            self._ranges[agent] = max(radius, self._ranges.get(agent, 0))
+            self._max_range = max(self._ranges.values())
+
+    def unsubscribe(self, agent):
+        super().unsubscribe(agent)
+        if self._ranges.pop(agent, None) is not None:
+            self._max_range = max(self._ranges.values(), default=0)
+
+    def interested(self, precept):
+        agents = super().interested(precept)
+        if not self._ranges:
+            return agents
+
+        try:
+            position = precept.position
+        except AttributeError:
+            try:
+                position = self._positions[precept.entity]
+            except (AttributeError, KeyError, TypeError):
+                return agents
+
+        ranges = self._ranges
+        positions = self._positions
+        for agent in self._spatial.in_radius(position, self._max_range):
+            try:
+                radius = ranges[agent]
+            except KeyError:
+                continue
+            if distance2(position, positions[agent]) <= radius * radius:
+                agents.add(agent)
+
+        return agents
+
     def model_vision(self, precept, origin, terminus):
         return precept
 
@@ -96,14 +264,20 @@ class Environment2D(Environment, Pathfinding2D):
     def look(self, parent, direction=None, distance=None):
         """
         Simulate vision by sending precepts to the parent.
+
+        Only entities within distance (default: vision_radius) can be seen.
         """
+        if distance is None:
+            distance = self.vision_radius
+
         model = self.model_precept
-        get_position = self.get_position
+        positions = self._positions
+        origin = positions[parent]
 
-        for entity in self.entities:
+        for entity in self._spatial.in_radius(origin, distance):
             parent.process(
                 model(
-                    PositionPrecept(entity, get_position(entity)),
+                    PositionPrecept(entity, positions[entity]),
                     parent
                 )
             )
@@ -112,40 +286,105 @@ class Environment2D(Environment, Pathfinding2D):
         """
         Return all objects exactly at a given position.
         """
-        return [obj for obj in self.entities if obj.position == position]
+        return self._spatial.at(position)
 
     def objects_near(self, position, radius):
         """
         Return all objects within radius of position.
         """
-        radius2 = radius * radius
-        return [obj for obj in self.entities
-                if distance2(position, obj.position) <= radius2]
+        return self._spatial.in_radius(position, radius)
+
+    def objects_in(self, left, top, right, bottom):
+        """
+        Return all objects inside a rectangle, edges included.
+        """
+        return self._spatial.in_rect(left, top, right, bottom)
 
     def default_position(self):
-        loc = (random.randint(0, self.width), random.randint(0, self.height))
-        return self, loc
+        return (random.randint(0, self.width - 1),
+                random.randint(0, self.height - 1))
 
     def model_precept(self, precept, other):
         return precept
 
     def can_move_from(self, agent, dist=100):
         """
-        return a list of positions that are possible for this agent to be
-        in if it were to move [dist] spaces or less.
+        return the positions that are possible for this agent to be in if it
+        were to move [dist] spaces or less, as a Reachable set.
         """
-        x, y = agent.environment.get_position(agent)[1]
-        pos = list()
+        return self.reachable(self.get_position(agent), dist)
 
-        for xx in range(x - dist, x + dist):
-            for yy in range(y - dist, y + dist):
-                if distance2((xx, yy), (x, y)) <= dist:
-                    pos.append((self, (xx, yy)))
+    def reachable(self, position, radius):
+        """
+        Return a Reachable set of the open cells within radius of position.
 
-        return pos
+        The set is kept as one mask per row; iterate over it for positions,
+        test positions with `in`, or pick one with sample().
+        """
+        return Reachable(self.grid, position, radius)
 
     def pathfind(self, start, finish):
         """
-        return a path from start to finish
+        return a path of positions from start to finish, avoiding cells that
+        are blocked on self.grid.  the path is empty if finish is unreachable.
+
+        paths are cached until the grid changes.  once a goal has been asked
+        for flow_field_requests times, a flow field is made for it and paths
+        to it are read from the field.
+        """
+        if finish not in self._fields:
+            requests = self._requests.get(finish, 0) + 1
+            if requests < self.flow_field_requests:
+                if len(self._requests) >= self.path_cache_size:
+                    self._requests.clear()
+                self._requests[finish] = requests
+                return self.path_cache.path(self.grid, start, finish)
+
+        return self.flow_field(finish).path(start)
+
+    def flow_field(self, goal):
+        """
+        Return a FlowField toward goal, for reading next steps in O(1).
+        The most recently used fields are kept until the grid changes.
+        """
+        field = self._fields.get(goal)
+        if field is None or field.stale or field.grid is not self.grid:
+            field = FlowField(self.grid, goal)
+            self._fields[goal] = field
+            self._requests.pop(goal, None)
+            while len(self._fields) > self.flow_field_count:
+                self._fields.popitem(last=False)
+        else:
+            self._fields.move_to_end(goal)
+        return field
+
+    def next_step(self, start, finish):
+        """
+        Return the position to move to from start on the way to finish, or
+        None if start is finish or finish cannot be reached
+        """
+        return self.flow_field(finish).next_step(start)
+
+    def path_planner(self, start, finish):
+        """
+        Return a DStarLite from start to finish, for entities that walk
+        while the map changes around them.  Call move() as the entity walks
+        and path() for the path; changes to self.grid are repaired rather
+        than searched again.
+        """
+        return DStarLite(self.grid, start, finish)
+
+    def _search(self, grid, start, finish):
+        """
+        large maps are searched with HPA*, which builds an abstract graph the
+        first time and gives paths that are close to the cheapest.  smaller
+        maps use jump point search if every open cell costs the same, and
+        plain a* if not.
         """
-        return search(start, finish, self.factory)
+        if len(grid) >= self.hierarchical_size:
+            if self._hpa is None or self._hpa.grid is not grid:
+                self._hpa = HierarchicalMap(grid)
+            return self._hpa.path(start, finish)
+        if grid.uniform:
+            return jps(grid, start, finish)
+        return astar(grid, start, finish)
@@ -10,16 +10,32 @@ plan for the agent to follow that will (possibly) satisfy the chosen goal.
 test() should return a float from 0-1 on how successful the action would be
 if carried out with the given state of the memory.
 
+pretest() is a quick check before test(), given a set of precept types.
+
 touch() should modify a memory in some meaningful way as if the action was
 finished successfully.
+
+heuristic() is used by the planner to estimate how many actions are still
+needed to satisfy the goal.  It should not overestimate.
+
+Goals declare what their relevancy depends on: required_types is the set of
+precept types they read, and required_keys narrows keyed types (Datum and
+Mood precepts) to (type, entity, name) keys.  A goal that declares nothing
+is taken to always have the same relevancy.  An agent keeps its goals in a
+GoalSet, which only scores a goal again when a precept it depends on has
+changed.
 """
 __all__ = ['GoalBase',
            'WeightedGoal',
            'PreceptGoal',
            'EvalGoal',
            'AlwaysValidGoal',
-           'NeverValidGoal']
+           'NeverValidGoal',
+           'GoalSet']
 
+from collections import defaultdict
+from heapq import heappush, heappop, heapify
+from itertools import count
 import logging
 import re
 
@@ -47,11 +63,15 @@ class GoalBase:
             self.condition = None
 
         self.required_types = frozenset()
+        self.required_keys = frozenset()
 
         self.weight = kwargs.get('weight', None)
         if self.weight is None:
             self.weight = 1.0
 
+        # plan backward from this goal; None leaves it to the agent
+        self.regressive = kwargs.get('regressive', None)
+
         self.args = args
         self.kw = kwargs
 
@@ -61,6 +81,14 @@ class GoalBase:
     def test(self, memory):
         raise NotImplementedError
 
+    def pretest(self, types):
+        """
+        Quick check before a test, given a set of precept types: the types in
+        a memory, or the types changed since a test last failed.  Return
+        False only if the test cannot pass.
+        """
+        return True
+
     def get_relevancy(self, memory):
         """
         will return the "relevancy" value for this goal/prereq.
@@ -68,6 +96,12 @@ class GoalBase:
         score = 1 - self.test(memory)
         return self.weight * score
 
+    def heuristic(self, memory):
+        """
+        estimate the cost to satisfy this goal from the memory
+        """
+        return 1.0 - self.test(memory)
+
     def __repr__(self):
         try:
             return "<Goal: {}>".format(self.name)
@@ -104,12 +138,16 @@ class PreceptGoal(GoalBase):
                 raise ValueError
 
         self.required_types = frozenset(type(i) for i in self.args)
+        self.required_keys = frozenset((type(i), i.entity, i.name)
+                                       for i in self.args
+                                       if isinstance(i, (DatumPrecept,
+                                                         MoodPrecept)))
 
-    def pretest(self, precepts):
+    def pretest(self, types):
         """
-        A pretest is a quicker test that should be called on a Memory delta
+        Only precepts of the required types can satisfy the goal
         """
-        return not self.required_types.isdisjoint(list(map(type, precepts)))
+        return not self.required_types.isdisjoint(types)
 
     def test(self, memory):
         total = 0.0
@@ -118,6 +156,19 @@ class PreceptGoal(GoalBase):
                 total += 1
         return total / len(self.args)
 
+    def heuristic(self, memory):
+        """
+        the number of precepts that are not in the memory.
+
+        only admissible if each action provides at most one of the precepts;
+        goals that break that rule should scale this down.
+        """
+        missing = 0
+        for precept in self.args:
+            if precept not in memory:
+                missing += 1
+        return missing
+
     def touch(self, memory):
         memory.update(self.args)
 
@@ -184,6 +235,10 @@ class PositionGoal(GoalBase):
     This validator is for finding the position of objects.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.required_types = frozenset([PositionPrecept])
+
     def test(self, memory):
         """
         search memory for last known position of the target
@@ -223,3 +278,144 @@ class PositionGoal(GoalBase):
         memory.add(PositionPrecept(self.args[0], self.args[1]))
 
 
+class GoalSet(set):
+    """
+    Set of goals that keeps them ranked by relevancy
+
+    Scores are kept in a heap.  When precepts change, changed() finds the
+    goals that depend on them (see GoalBase.required_types and
+    required_keys); only those are scored again by the next call to
+    ranked().  Goals that declare neither are scored every time.
+    """
+    keyed = (DatumPrecept, MoodPrecept)
+
+    def __init__(self, iterable=()):
+        super().__init__()
+        self._entries = dict()      # goal -> (-relevancy, counter, goal)
+        self._heap = list()
+        self._counter = count()
+        self._dirty = set()         # goals that need to be scored again
+        self._undeclared = set()    # goals that are always scored again
+        self._by_type = defaultdict(set)
+        self._by_key = defaultdict(set)
+        self.update(iterable)
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+    def _index(self, goal):
+        if not goal.required_types and not goal.required_keys:
+            self._undeclared.add(goal)
+            return
+        keyed_types = {key[0] for key in goal.required_keys}
+        for t in goal.required_types:
+            if t not in keyed_types:
+                self._by_type[t].add(goal)
+        for key in goal.required_keys:
+            self._by_key[key].add(goal)
+
+    def _unindex(self, goal):
+        self._undeclared.discard(goal)
+        for index, keys in ((self._by_type, goal.required_types),
+                            (self._by_key, goal.required_keys)):
+            for key in keys:
+                goals = index.get(key)
+                if goals is not None:
+                    goals.discard(goal)
+                    if not goals:
+                        del index[key]
+
+    def add(self, goal):
+        if goal in self:
+            return
+        super().add(goal)
+        self._index(goal)
+        self._dirty.add(goal)
+
+    def update(self, *others):
+        add = self.add
+        for other in others:
+            for goal in other:
+                add(goal)
+
+    def remove(self, goal):
+        super().remove(goal)
+        self._unindex(goal)
+        self._entries.pop(goal, None)
+        self._dirty.discard(goal)
+
+    def discard(self, goal):
+        if goal in self:
+            self.remove(goal)
+
+    def clear(self):
+        super().clear()
+        self._entries.clear()
+        self._heap = list()
+        self._dirty.clear()
+        self._undeclared.clear()
+        self._by_type.clear()
+        self._by_key.clear()
+
+    def changed(self, precepts=None):
+        """
+        Score the goals that depend on these precepts again.  If precepts is
+        None, every goal is scored again.
+        """
+        if precepts is None:
+            self._dirty.update(self)
+            return
+
+        # deref for speed
+        dirty = self._dirty
+        by_type = self._by_type
+        by_key = self._by_key
+        keyed = self.keyed
+
+        for precept in precepts:
+            t = type(precept)
+            goals = by_type.get(t)
+            if goals:
+                dirty.update(goals)
+            if isinstance(precept, keyed):
+                goals = by_key.get((t, precept.entity, precept.name))
+                if goals:
+                    dirty.update(goals)
+
+    def _score(self, memory):
+        entries = self._entries
+        heap = self._heap
+        self._dirty.update(self._undeclared)
+        for goal in self._dirty:
+            entry = -goal.get_relevancy(memory), next(self._counter), goal
+            entries[goal] = entry
+            heappush(heap, entry)
+        self._dirty.clear()
+
+        # drop the old scores if they have piled up
+        if len(heap) > 2 * len(entries) + 16:
+            self._heap = list(entries.values())
+            heapify(self._heap)
+
+    def ranked(self, memory):
+        """
+        Yield (relevancy, goal) for the relevant goals (relevancy > 0), most
+        relevant first.  Goals are scored against memory only if they changed.
+        """
+        self._score(memory)
+        heap = self._heap
+        entries = self._entries
+        taken = list()
+        try:
+            while heap:
+                entry = heappop(heap)
+                if entries.get(entry[2]) is not entry:
+                    # scored again since
+                    continue
+                taken.append(entry)
+                if entry[0] >= 0:
+                    break
+                yield -entry[0], entry[2]
+        finally:
+            for entry in taken:
+                heappush(heap, entry)
@@ -1,22 +1,493 @@
 """
 Memories are stored precepts.
+
+When a memory is full, its eviction policy chooses the precept to forget.
+Policies only see precepts that are not pinned, so pinned precepts are never
+forgotten.  All policies do O(1) work per change.
 """
+__all__ = ['EvictionPolicy',
+           'OldestFirst',
+           'LeastRecentlyUsed',
+           'TypeQuota',
+           'MemoryManager',
+           'MemoryLayer']
+
+from collections import OrderedDict
+
+from pygoap.precepts import DatumPrecept, MoodPrecept
+
+
+class EvictionPolicy:
+    """
+    Choose which precept a full memory should forget
+    """
+
+    def copy(self):
+        """
+        Return an empty policy with the same settings
+        """
+        return self.__class__()
+
+    def added(self, precept):
+        pass
+
+    def removed(self, precept):
+        pass
+
+    def accessed(self, precept):
+        pass
+
+    def clear(self):
+        pass
+
+    def order(self, memory):
+        """
+        Return the precepts of memory, the oldest first
+        """
+        return list(memory)
+
+    def victim(self, memory, incoming):
+        """
+        Called before a new precept is added.  Return the precept to forget
+        to make room for incoming, or None to keep everything.
+        """
+        raise NotImplementedError
+
+
+class OldestFirst(EvictionPolicy):
+    """
+    Forget the precept that was added first.  Precepts arrive in simulation
+    order, so this is also the oldest by simulation time.
+    """
+
+    def __init__(self):
+        self._order = OrderedDict()
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def added(self, precept):
+        self._order[precept] = None
+
+    def removed(self, precept):
+        self._order.pop(precept, None)
+
+    def clear(self):
+        self._order.clear()
+
+    def order(self, memory):
+        # pinned precepts are not in the order; they go first
+        return [p for p in memory if p not in self._order] + list(self._order)
+
+    def victim(self, memory, incoming):
+        if len(memory) >= memory.max_size:
+            for precept in self._order:
+                return precept
+
+
+class LeastRecentlyUsed(OldestFirst):
+    """
+    Forget the precept that was added or used the longest time ago.  A
+    precept is used when it is added again or returned by latest().
+    """
+
+    def accessed(self, precept):
+        try:
+            self._order.move_to_end(precept)
+        except KeyError:
+            pass
+
+
+class TypeQuota(EvictionPolicy):
+    """
+    Limit the number of precepts of some types.  When a type is at its quota,
+    the oldest precept of that type is forgotten, even if the memory is not
+    full; otherwise the fallback policy decides.
+
+        TypeQuota({PositionPrecept: 20, SpeechPrecept: 10})
+    """
+
+    def __init__(self, quotas, fallback=None):
+        self.quotas = dict(quotas)
+        self.fallback = OldestFirst() if fallback is None else fallback
+        self._by_type = {t: OrderedDict() for t in self.quotas}
+
+    def copy(self):
+        return self.__class__(self.quotas, self.fallback.copy())
+
+    def added(self, precept):
+        self.fallback.added(precept)
+        try:
+            self._by_type[type(precept)][precept] = None
+        except KeyError:
+            pass
+
+    def removed(self, precept):
+        self.fallback.removed(precept)
+        try:
+            self._by_type[type(precept)].pop(precept, None)
+        except KeyError:
+            pass
+
+    def accessed(self, precept):
+        self.fallback.accessed(precept)
+
+    def order(self, memory):
+        return self.fallback.order(memory)
+
+    def clear(self):
+        self.fallback.clear()
+        for order in self._by_type.values():
+            order.clear()
+
+    def victim(self, memory, incoming):
+        order = self._by_type.get(type(incoming))
+        if order and len(order) >= self.quotas[type(incoming)]:
+            for precept in order:
+                return precept
+        return self.fallback.victim(memory, incoming)
 
 
 class MemoryManager(set):
     """
     Store and manage precepts.
+
+    Precepts are indexed by type, by entity, and for keyed precepts (Datum,
+    Mood), by (type, entity, name).  The indexes are kept up to date by every
+    method that changes the set.
+
+    A memory holds at most max_size precepts; the policy (OldestFirst by
+    default) chooses which precept is forgotten to make room.
     """
 
     max_size = 300
+    keyed = (DatumPrecept, MoodPrecept)
+
+    def __init__(self, iterable=(), max_size=None, policy=None):
+        super().__init__()
+        if max_size is not None:
+            self.max_size = max_size
+        self.policy = OldestFirst() if policy is None else policy
+        self._pinned = set()
+        self._by_type = dict()
+        self._by_entity = dict()
+        self._by_key = dict()
+        self.update(iterable)
+
+    def __reduce__(self):
+        # adding the precepts oldest first gives the copy the same order
+        return (self.__class__,
+                (self.policy.order(self), self.max_size, self.policy.copy()),
+                {'_pinned': set(self._pinned)})
+
+    def __setstate__(self, state):
+        for precept in state.get('_pinned', ()):
+            self.pin(precept)
+
+    def pin(self, precept):
+        """
+        Never forget this precept.  It does not need to be in memory yet.
+        """
+        self._pinned.add(precept)
+        self.policy.removed(precept)
+
+    def unpin(self, precept):
+        self._pinned.discard(precept)
+        if precept in self:
+            self.policy.added(precept)
+
+    def _index(self, precept):
+        if precept not in self._pinned:
+            self.policy.added(precept)
+
+        try:
+            self._by_type[type(precept)].add(precept)
+        except KeyError:
+            self._by_type[type(precept)] = {precept}
+
+        try:
+            entity = precept.entity
+        except AttributeError:
+            return
+
+        try:
+            self._by_entity[entity].add(precept)
+        except KeyError:
+            self._by_entity[entity] = {precept}
+
+        if isinstance(precept, self.keyed):
+            key = type(precept), entity, precept.name
+            try:
+                self._by_key[key][precept] = None
+            except KeyError:
+                # dicts are ordered, the last key is the latest precept
+                self._by_key[key] = {precept: None}
+
+    def _unindex(self, precept):
+        self.policy.removed(precept)
+        t = type(precept)
+        index = self._by_type[t]
+        index.discard(precept)
+        if not index:
+            del self._by_type[t]
+
+        try:
+            entity = precept.entity
+        except AttributeError:
+            return
+
+        index = self._by_entity[entity]
+        index.discard(precept)
+        if not index:
+            del self._by_entity[entity]
+
+        if isinstance(precept, self.keyed):
+            key = t, entity, precept.name
+            index = self._by_key[key]
+            del index[precept]
+            if not index:
+                del self._by_key[key]
 
     def add(self, other):
         assert (other is not None)
-        if len(self) > MemoryManager.max_size:
-            self.pop()
+        if other in self:
+            self.policy.accessed(other)
+            if isinstance(other, self.keyed):
+                # seen again, so it is the latest value for the key
+                index = self._by_key[type(other), other.entity, other.name]
+                del index[other]
+                index[other] = None
+            return
+
+        victim = self.policy.victim(self, other)
+        if victim is not None:
+            self.remove(victim)
         super().add(other)
+        self._index(other)
+
+    def update(self, *others):
+        add = self.add
+        for other in others:
+            for precept in other:
+                add(precept)
+
+    def remove(self, other):
+        super().remove(other)
+        self._unindex(other)
+
+    def discard(self, other):
+        if other in self:
+            super().remove(other)
+            self._unindex(other)
+
+    def pop(self):
+        precept = super().pop()
+        self._unindex(precept)
+        return precept
+
+    def clear(self):
+        super().clear()
+        self.policy.clear()
+        self._by_type.clear()
+        self._by_entity.clear()
+        self._by_key.clear()
+
+    def difference_update(self, *others):
+        discard = self.discard
+        for other in others:
+            for precept in list(other):
+                discard(precept)
+
+    def intersection_update(self, *others):
+        keep = set(self).intersection(*others)
+        self.difference_update([i for i in self if i not in keep])
+
+    def symmetric_difference_update(self, other):
+        other = set(other)
+        for precept in other:
+            if precept in self:
+                self.remove(precept)
+            else:
+                self.add(precept)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
 
     def of_class(self, klass):
-        for i in self:
+        for t, precepts in list(self._by_type.items()):
+            if issubclass(t, klass):
+                yield from precepts
+
+    def of_entity(self, entity):
+        """
+        Return all precepts about an entity
+        """
+        return iter(self._by_entity.get(entity, ()))
+
+    def entities(self):
+        """
+        Return all entities that are the subject of a precept
+        """
+        return iter(self._by_entity)
+
+    def types(self):
+        """
+        Return the types of the precepts in memory
+        """
+        return iter(self._by_type)
+
+    def of_key(self, klass, entity, name):
+        """
+        Return all Datum or Mood precepts for an entity's key, oldest first
+        """
+        return iter(self._by_key.get((klass, entity, name), ()))
+
+    def latest(self, klass, entity, name, default=None):
+        """
+        Return the most recent Datum or Mood precept for an entity's key
+        """
+        try:
+            index = self._by_key[klass, entity, name]
+        except KeyError:
+            return default
+        precept = next(reversed(index))
+        self.policy.accessed(precept)
+        return precept
+
+
+class MemoryLayer:
+    """
+    Memory used by the planner.
+
+    A layer shares the memory it was made from (the base) and stores only the
+    precepts that were added on top of it.  Copying a layer copies the added
+    precepts, never the base, so child planning nodes stay cheap no matter
+    how large the agent's memory is.
+    """
+    __slots__ = 'base added'.split()
+
+    def __init__(self, base, added=None):
+        self.base = base
+        self.added = set() if added is None else set(added)
+
+    def __contains__(self, precept):
+        return precept in self.added or precept in self.base
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.added
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+    def __repr__(self):
+        return "<MemoryLayer: {} + {}>".format(len(self.base), self.added)
+
+    def copy(self):
+        return MemoryLayer(self.base, self.added)
+
+    def add(self, other):
+        assert (other is not None)
+        if other not in self.base:
+            self.added.add(other)
+
+    def update(self, *others):
+        add = self.add
+        for other in others:
+            for precept in other:
+                add(precept)
+
+    def of_class(self, klass):
+        if isinstance(self.base, MemoryManager):
+            yield from self.base.of_class(klass)
+        else:
+            for i in self.base:
+                if isinstance(i, klass):
+                    yield i
+
+        for i in self.added:
             if isinstance(i, klass):
                 yield i
+
+    def of_entity(self, entity):
+        """
+        Return all precepts about an entity
+        """
+        if isinstance(self.base, MemoryManager):
+            yield from self.base.of_entity(entity)
+        else:
+            for i in self.base:
+                if getattr(i, "entity", None) == entity:
+                    yield i
+
+        for i in self.added:
+            if getattr(i, "entity", None) == entity:
+                yield i
+
+    def entities(self):
+        """
+        Return all entities that are the subject of a precept
+        """
+        if isinstance(self.base, MemoryManager):
+            seen = set(self.base.entities())
+        else:
+            seen = {i.entity for i in self.base if hasattr(i, "entity")}
+        yield from seen
+
+        for i in self.added:
+            try:
+                entity = i.entity
+            except AttributeError:
+                continue
+            if entity not in seen:
+                seen.add(entity)
+                yield entity
+
+    def of_key(self, klass, entity, name):
+        """
+        Return all Datum or Mood precepts for an entity's key.  Precepts in
+        the base come first, oldest first, then the added ones.
+        """
+        if isinstance(self.base, MemoryManager):
+            yield from self.base.of_key(klass, entity, name)
+        else:
+            for i in self.base:
+                if type(i) is klass and i.entity == entity and \
+                        i.name == name:
+                    yield i
+
+        for i in self.added:
+            if type(i) is klass and i.entity == entity and i.name == name:
+                yield i
+
+    def latest(self, klass, entity, name, default=None):
+        """
+        Return the most recent Datum or Mood precept for an entity's key.
+        Added precepts are newer than the base; if more than one was added
+        for the key, any of them may be returned.
+        """
+        for i in self.added:
+            if type(i) is klass and i.entity == entity and i.name == name:
+                return i
+
+        if isinstance(self.base, MemoryManager):
+            return self.base.latest(klass, entity, name, default)
+
+        precept = default
+        for i in self.base:
+            if type(i) is klass and i.entity == entity and i.name == name:
+                precept = i
+        return precept
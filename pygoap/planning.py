@@ -1,43 +1,179 @@
 from heapq import heappop, heappush, heappushpop, heapify
+from time import perf_counter
 import logging
 
-from pygoap.memory import MemoryManager
+from pygoap.goals import PreceptGoal
+from pygoap.memory import MemoryManager, MemoryLayer
 
 
 debug = logging.debug
 
 
+class PlanningStats:
+    """
+    Counters filled in by the planner.  Pass one to plan() to inspect a search.
+    """
+    __slots__ = 'expanded generated duplicates'.split()
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+
+    def __repr__(self):
+        return "<PlanningStats: expanded %s, generated %s, duplicates %s>" % \
+               (self.expanded, self.generated, self.duplicates)
+
+
+class ActionTable:
+    """
+    The actions of an agent's static abilities, made once and looked up for
+    every planning node.  Abilities that are not static are asked for their
+    actions every time.
+
+    Actions in the table are shared by the searches; plans get copies.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+        self._actions = dict()      # ability -> tuple of actions
+        self._effects = dict()      # ability -> see effects()
+
+    def __len__(self):
+        return len(self._actions)
+
+    def actions(self, ability, memory):
+        if not ability.static:
+            return ability.get_actions(self.agent, memory)
+        try:
+            return self._actions[ability]
+        except KeyError:
+            pass
+        actions = tuple(ability.get_actions(self.agent, None))
+        for action in actions:
+            action.template = True
+        self._actions[ability] = actions
+        return actions
+
+    def effects(self, ability, memory):
+        """
+        Return (action, provides, needs) for each action of the ability that
+        regress() can use: provides is the set of precepts its effects add,
+        and needs the set of precepts its prereqs test.  Actions with goals
+        that are not PreceptGoals are left out.
+        """
+        try:
+            return self._effects[ability]
+        except KeyError:
+            pass
+
+        entries = list()
+        for action in self.actions(ability, memory):
+            goals = list(action.effects) + list(action.prereqs)
+            if not all(isinstance(goal, PreceptGoal) for goal in goals):
+                continue
+            provides = frozenset(p for goal in action.effects
+                                 for p in goal.args)
+            needs = frozenset(p for goal in action.prereqs for p in goal.args)
+            entries.append((action, provides, needs))
+        entries = tuple(entries)
+        if ability.static:
+            self._effects[ability] = entries
+        return entries
+
+    def clear(self):
+        """
+        Forget the actions; call after changing a static ability
+        """
+        self._actions.clear()
+        self._effects.clear()
+
+
+def action_table(agent):
+    """
+    Return the agent's ActionTable, or a new one if it does not keep one
+    """
+    table = getattr(agent, 'action_table', None)
+    if table is None:
+        table = ActionTable(agent)
+    return table
+
+
 class PlanningNode:
-    __slots__ = 'parent action abilities memory agent delta time cost g h'.split()
+    """
+    Nodes are hashed by state: the precepts added since the start of the plan
+    and the abilities that are still available.  Two nodes reached by
+    different orderings of the same actions compare equal.
+
+    Memory is a MemoryLayer over a single copy of the starting memory, so
+    making a child only copies the precepts added while planning.
+
+    types is the set of precept types in the memory, and changed is the set
+    of types added since the parent (None for the first node).  Pretests
+    look at these instead of the memory.
+    """
+    __slots__ = 'parent action abilities memory agent delta state key ' \
+                'types changed time cost g h'.split()
 
     def __init__(self, parent, action, abilities, memory=None, agent=None):
         self.parent = parent
         self.action = action
-        self.abilities = abilities
-        self.memory = MemoryManager()
+        self.abilities = frozenset(abilities)
         self.agent = agent
-        self.delta = MemoryManager()
         self.time = 0
         self.cost = 1
         self.g = -1
         self.h = 1
 
         if parent:
-            self.memory.update(parent.memory)
+            self.memory = parent.memory.copy()
+            if agent is None:
+                self.agent = parent.agent
 
-        elif memory:
-            self.memory.update(memory)
+        else:
+            # big enough that none of the starting memory is forgotten
+            memory = memory or ()
+            base = MemoryManager(memory, max_size=len(memory))
+            self.memory = MemoryLayer(base)
 
         if action:
             action.touch(self.memory)
-            action.touch(self.delta)
+
+        added = self.memory.added
+        if parent:
+            self.delta = added.difference(parent.state)
+            if self.delta:
+                self.state = parent.state.union(self.delta)
+                self.changed = frozenset(map(type, self.delta))
+                self.types = parent.types \
+                    if self.changed <= parent.types \
+                    else parent.types.union(self.changed)
+            else:
+                self.state = parent.state
+                self.changed = frozenset()
+                self.types = parent.types
+        else:
+            self.delta = added
+            self.state = frozenset(added)
+            self.changed = None
+            types = set(self.memory.base.types())
+            types.update(map(type, added))
+            self.types = frozenset(types)
+
+        self.key = (self.state, self.abilities)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return self.key == other.key
 
     def __repr__(self):
         if self.parent:
             return "<PlanningNode: '%s', cost: %s, p: %s>" % \
                    (self.action.__class__.__name__,
                     self.cost,
-                    self.parent.context.__class__.__name__)
+                    self.parent.action.__class__.__name__)
 
         else:
             return "<PlanningNode: '%s', cost: %s, p: None>" % \
@@ -46,31 +182,126 @@ class PlanningNode:
 
 
 # TODO: make recursive
-def get_children(parent):
-    for ability in parent.abilities:
-        if parent.agent is None:
-            debug("parent.agent is None?")
-            continue
+def get_children(parent, table):
+    if parent.agent is None:
+        debug("parent.agent is None?")
+        return
+
+    # deref for speed
+    get_actions = table.actions
+    memory = parent.memory
+    types = parent.types
 
-        for action in ability.get_actions(parent.agent, parent.memory):
-            if action.pretest(parent.memory):
-                if action.test(parent.memory) > 0.0:
-                    abilities = parent.abilities.copy()
-                    abilities.remove(ability)
+    for ability in parent.abilities:
+        for action in get_actions(ability, memory):
+            if action.pretest(types):
+                if action.test(memory) > 0.0:
+                    abilities = parent.abilities.difference((ability,))
                     yield PlanningNode(parent, action, abilities)
             else:
                 debug("[plan] action %s fail pretest", action)
 
 
-def plan(goal, agent, start_action, abilities, start_memory):
-    node = PlanningNode(None, start_action, abilities, start_memory, agent)
-    return _plan(node, goal)
+def plan(goal, agent, start_action, abilities, start_memory, stats=None,
+         heuristic=None, max_expanded=None, max_time=None, anytime=False):
+    """
+    heuristic is a callable that estimates the cost left to satisfy the goal
+    from a memory.  By default the goal's own heuristic is used.
+
+    the search gives up after expanding max_expanded nodes, or after
+    max_time seconds.  it then returns an empty list, or if anytime is set,
+    the plan to the node closest to the goal (see PlanSearch.best).
+    """
+    search = PlanSearch(goal, agent, start_action, abilities, start_memory,
+                        stats, heuristic)
+    path = search.run(max_expanded, max_time)
+    if path is None:
+        return search.best() if anytime else list()
+    return path
 
 
-def _plan(key_node, goal):
+class PlanSearch:
     """
-    Return a list of contexts that could be called to satisfy the goal.
-    Cannot duplicate contexts in the plan
+    A search that can be run a little at a time, so planning can be spread
+    over many ticks:
+
+        search = PlanSearch(goal, agent, None, abilities, memory)
+        path = search.run(max_expanded=100)     # None until it is done
+
+    The start memory is copied when the search is made, so the search does
+    not change if the memory does.
+    """
+
+    def __init__(self, goal, agent, start_action, abilities, start_memory,
+                 stats=None, heuristic=None):
+        if stats is None:
+            stats = PlanningStats()
+        node = PlanningNode(None, start_action, abilities, start_memory, agent)
+        self.goal = goal
+        self.stats = stats
+        self.path = None            # set when the search is done
+        self._best = node
+        self._steps = _search(node, goal, stats, heuristic)
+
+    def __repr__(self):
+        return "<PlanSearch: {}, {}>".format(self.goal, self.stats)
+
+    @property
+    def done(self):
+        return self.path is not None
+
+    def run(self, max_expanded=None, max_time=None):
+        """
+        Search until it is done, or until max_expanded nodes were expanded
+        or max_time seconds have passed in this call.
+
+        Return the plan (an empty list if there is none), or None if the
+        search is not done.
+        """
+        if self.path is not None:
+            return self.path
+
+        # deref for speed
+        steps = self._steps
+        timer = perf_counter
+
+        deadline = None if max_time is None else timer() + max_time
+        expanded = 0
+        try:
+            while 1:
+                if max_expanded is not None and expanded >= max_expanded:
+                    return None
+                if deadline is not None and timer() >= deadline:
+                    return None
+                self._best = next(steps)
+                expanded += 1
+        except StopIteration as stop:
+            node = stop.value
+
+        self.path = self._result(node)
+        return self.path
+
+    def _result(self, node):
+        return list() if node is None else _path(node)
+
+    def best(self):
+        """
+        Return the plan to the node with the lowest heuristic found so far.
+        If the search is done, return its plan.
+        """
+        if self.path:
+            return self.path
+        return _path(self._best)
+
+
+def _search(key_node, goal, stats, heuristic=None):
+    """
+    Search for a node that satisfies the goal.  Cannot duplicate contexts in
+    the plan.
+
+    This is a generator: after each node is expanded, it yields the node with
+    the lowest heuristic so far.  It returns the node that satisfies the
+    goal, or None if there is none.
     """
     # heap_counter works around a 'bug' in python 3.x where the next value in a
     # tuple is compared if the current set are equal.  using heap_counter
@@ -78,18 +309,23 @@ def _plan(key_node, goal):
     heap = list()
     heap_counter = 0
     heap_index = dict()
-    open_list = set()
+    open_list = dict()
     closed_list = set()
+    if heuristic is None:
+        heuristic = goal.heuristic
+    table = action_table(key_node.agent)
 
     # deref for speed
-    open_list_add = open_list.add
-    open_list_remove = open_list.remove
+    open_list_get = open_list.get
+    open_list_pop = open_list.pop
     closed_list_add = closed_list.add
     heap_remove = heap.remove
 
     # the pushback minimizes heap use and provides a modest speed improvement
+    key_node.h = heuristic(key_node.memory)
     pushback = (0, heap_counter, key_node)
-    open_list_add(key_node)
+    open_list[key_node] = key_node
+    best = key_node
 
     debug("[plan] memory supplied is %s", key_node.memory)
 
@@ -99,36 +335,194 @@ def _plan(key_node, goal):
             pushback = None
         else:
             key_node = heappop(heap)[2]
-        if goal.test(key_node.memory):
+        # the goal failed for the parent, so it can only pass if a type it
+        # needs was added since
+        changed = key_node.changed
+        if (changed is None or goal.pretest(changed)) and \
+                goal.test(key_node.memory) >= 1.0:
             break
-        open_list_remove(key_node)
+        open_list_pop(key_node)
         closed_list_add(key_node)
-        children = [i for i in get_children(key_node) if not i in closed_list]
-        for child in children:
+        stats.expanded += 1
+        for child in get_children(key_node, table):
+            stats.generated += 1
+            if child in closed_list:
+                stats.duplicates += 1
+                continue
             g = key_node.g + child.cost
-            if child not in open_list or g < child.g:
+            # open_list maps a state to the node currently queued for it
+            known = open_list_get(child)
+            if known is not None:
+                stats.duplicates += 1
+            if known is None or g < known.g:
                 heap_counter += 1
                 child.parent = key_node
                 child.g = g
-                if child in open_list:
-                    heap_remove(heap_index[child])
-                    heapify(heap)
-                else:
-                    open_list_add(child)
+                child.h = heuristic(child.memory)
+                if child.h < best.h:
+                    best = child
+                if known is not None:
+                    entry = heap_index.pop(known)
+                    if entry is pushback:
+                        pushback = None
+                    else:
+                        heap_remove(entry)
+                        heapify(heap)
+                    del open_list[known]
+                open_list[child] = child
                 entry = (child.g + child.h, heap_counter, child)
                 heap_index[child] = entry
                 if pushback:
                     heappush(heap, pushback)
                 pushback = entry
+        yield best
 
     # else is reached when while() test becomes false
     # under normal circumstances, the loop should break when path is found
     else:
-        return list()
+        return None
 
     debug("[plan] successful %s %s", key_node.action, key_node.action)
-    path = [[key_node.action]]
-    while key_node.parent is not None:
-        key_node = key_node.parent
-        path.append([key_node.action])
+    return key_node
+
+
+def _path(node):
+    path = list()
+    while node is not None:
+        path.append([_copy(node.action)])
+        node = node.parent
+    return path
+
+
+def _copy(action):
+    if action is not None and action.template:
+        return action.copy()
+    return action
+
+
+def regress(goal, agent, start_action, abilities, start_memory, stats=None,
+            max_expanded=None, max_time=None):
+    """
+    Plan backward from the goal.  Same arguments and result as plan().
+
+    The search starts with the goal's precepts that are not in memory, and
+    works back through the actions whose effects add them, until every
+    precept an action needs is in memory.  Only actions that provide a
+    missing precept are looked at, so agents with many abilities and narrow
+    goals search far fewer nodes than plan() does.
+
+    Only PreceptGoals can be planned backward; other goals are planned with
+    plan().  Actions with goals that are not PreceptGoals are not used.  An
+    action needs all of its prereqs' precepts, and each ability is used at
+    most once, as in plan().
+    """
+    search = RegressSearch(goal, agent, start_action, abilities, start_memory,
+                           stats)
+    path = search.run(max_expanded, max_time)
+    return list() if path is None else path
+
+
+class RegressSearch(PlanSearch):
+    """
+    Backward search (see regress) that can be run a little at a time, like
+    PlanSearch.  A backward search has no partial plan to follow, so best()
+    is empty until it is done.
+    """
+
+    def __init__(self, goal, agent, start_action, abilities, start_memory,
+                 stats=None):
+        self.forward = not isinstance(goal, PreceptGoal)
+        if self.forward:
+            super().__init__(goal, agent, start_action, abilities,
+                             start_memory, stats)
+            return
+
+        if stats is None:
+            stats = PlanningStats()
+        self.goal = goal
+        self.stats = stats
+        self.path = None
+        self.start_action = start_action
+        self._steps = _regress(goal, agent, start_action, abilities,
+                               frozenset(start_memory), stats)
+
+    def _result(self, path):
+        if self.forward:
+            return super()._result(path)
+        return path
+
+    def best(self):
+        if self.forward or self.path:
+            return super().best()
+        return [[self.start_action]]
+
+
+def _regress(goal, agent, start_action, abilities, known, stats):
+    """
+    Generator for RegressSearch: it yields after each node is expanded, and
+    returns the plan.  known is a frozenset of the start memory.
+    """
+    # effect -> action index
+    table = action_table(agent)
+    providers = dict()
+    for ability in abilities:
+        for action, provides, needs in table.effects(ability, known):
+            entry = ability, action, provides, needs
+            for precept in provides:
+                try:
+                    providers[precept].append(entry)
+                except KeyError:
+                    providers[precept] = [entry]
+
+    # a node is the precepts still missing and the abilities used
+    root = frozenset(p for p in goal.args if p not in known), frozenset()
+    g = {root: 0}
+    parent = {root: None}
+    closed = set()
+    heap = [(len(root[0]), 0, root)]
+    counter = 1
+
+    while heap:
+        f, i, node = heappop(heap)
+        if node in closed:
+            continue
+        missing, used = node
+        if not missing:
+            break
+        closed.add(node)
+        stats.expanded += 1
+        node_g = g[node]
+        yield
+
+        tried = set()
+        for precept in missing:
+            for entry in providers.get(precept, ()):
+                ability, action, provides, needs = entry
+                if ability in used or action in tried:
+                    continue
+                tried.add(action)
+                stats.generated += 1
+                child = (missing.difference(provides).union(
+                         p for p in needs if p not in known),
+                         used.union((ability,)))
+                if child in closed or node_g + 1 >= g.get(child, node_g + 2):
+                    stats.duplicates += 1
+                    continue
+                g[child] = node_g + 1
+                parent[child] = node, action
+                heappush(heap, (node_g + 1 + len(child[0]), counter, child))
+                counter += 1
+
+    # else is reached when there is nothing left to search
+    else:
+        return list()
+
+    # walking back from the last node gives the actions in the order they
+    # will be done; plans list them last first
+    path = list()
+    while parent[node] is not None:
+        node, action = parent[node]
+        path.append([_copy(action)])
+    path.reverse()
+    path.append([start_action])
     return path
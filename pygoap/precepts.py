@@ -2,9 +2,16 @@
 Contains a set of useful precept types for use with an environment.
 
 implementation note:
-    some evidence shows that named tuples are "slow".
+    precepts are interned: creating a precept that is equal to a live one
+    returns the live one.  this means equal precepts are always the same
+    object, so precepts are hashed and compared by identity, which is much
+    cheaper than hashing a tuple every time a memory is searched.  the
+    intern tables hold weak references, so unused precepts are freed.
+
+    precepts are immutable and keep namedtuple-style fields.
 """
-__all__ = ['PositionPrecept',
+__all__ = ['Precept',
+           'PositionPrecept',
            'TimePrecept',
            'DatumPrecept',
            'QueryPrecept',
@@ -13,31 +20,161 @@ __all__ = ['PositionPrecept',
            'SpeechPrecept',
            'MoodPrecept']
 
-from collections import namedtuple as nt
+from threading import Lock
+from weakref import WeakValueDictionary
+
+
+_intern_lock = Lock()
+
+
+def _types(value):
+    """
+    Return the type of value, with the types of its items if it is a tuple
+    or frozenset.  Equal values with different types get different keys.
+    """
+    t = type(value)
+    if t is tuple:
+        return tuple(map(_types, value))
+    if t is frozenset:
+        return frozenset((item, _types(item)) for item in value)
+    return t
+
+
+class Precept:
+    """
+    Base class for precepts.  Subclasses set _fields, and __slots__ to match.
+    """
+    __slots__ = ('__weakref__', )
+    _fields = ()
+    _table = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._table = WeakValueDictionary()
+
+    def __new__(cls, *args, **kwargs):
+        if kwargs:
+            args = cls._merge(args, kwargs)
+
+        # 1, 1.0 and True are equal, but a precept keeps the value it got
+        types = tuple(map(type, args))
+        if tuple in types or frozenset in types:
+            types = _types(args)
+        key = args, types
+        table = cls._table
+        try:
+            self = table.get(key)
+        except TypeError:
+            raise TypeError("{} fields must be hashable: {!r}".format(
+                cls.__name__, args)) from None
+
+        if self is None:
+            with _intern_lock:
+                self = table.get(key)
+                if self is None:
+                    self = cls._make(args)
+                    table[key] = self
+
+        return self
+
+    @classmethod
+    def _make(cls, args):
+        if len(args) != len(cls._fields):
+            raise TypeError("{} takes {} arguments ({} given)".format(
+                cls.__name__, len(cls._fields), len(args)))
+
+        self = object.__new__(cls)
+        for name, value in zip(cls._fields, args):
+            object.__setattr__(self, name, value)
+        return self
+
+    @classmethod
+    def _merge(cls, args, kwargs):
+        args = list(args)
+        for name in cls._fields[len(args):]:
+            try:
+                args.append(kwargs.pop(name))
+            except KeyError:
+                raise TypeError("{} missing argument '{}'".format(
+                    cls.__name__, name))
+        if kwargs:
+            raise TypeError("{} got unexpected arguments {}".format(
+                cls.__name__, list(kwargs)))
+        return tuple(args)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("precepts are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("precepts are immutable")
+
+    def __reduce__(self):
+        return self.__class__, tuple(self)
+
+    def __iter__(self):
+        for name in self._fields:
+            yield getattr(self, name)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        return getattr(self, self._fields[index])
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, ", ".join(
+            "{}={!r}".format(name, getattr(self, name))
+            for name in self._fields))
+
+    def _replace(self, **kwargs):
+        values = [kwargs.pop(name, getattr(self, name))
+                  for name in self._fields]
+        if kwargs:
+            raise ValueError("got unexpected fields {}".format(list(kwargs)))
+        return self.__class__(*values)
+
+    def _asdict(self):
+        return {name: getattr(self, name) for name in self._fields}
+
+
+class PositionPrecept(Precept):
+    """used to remember where entities are"""
+    __slots__ = _fields = ('entity', 'position')
+
+
+class TimePrecept(Precept):
+    """used to remember what the time is"""
+    __slots__ = _fields = ('time', )
+
+
+class DatumPrecept(Precept):
+    """used to remember a single piece of data"""
+    __slots__ = _fields = ('entity', 'name', 'value')
 
 
-# used to remember where entities are
-PositionPrecept = nt('PositionPrecept', 'entity, position')
+class QueryPrecept(Precept):
+    """used to query another agent"""
+    __slots__ = _fields = ('entity', 'name', 'value')
 
-# used to remember what the time is
-TimePrecept = nt('TimePrecept', 'time')
 
-# used to remember a single piece of data
-DatumPrecept = nt('DatumPrecept', 'entity, name, value')
+class ActionPrecept(Precept):
+    """used to remember "seeing" (or hearing) an action performed"""
+    __slots__ = _fields = ('entity', 'action', 'object')
 
-# used to query another agent
-QueryPrecept = nt('QueryPrecept', 'entity, name, value')
 
-# used to remember "seeing" (or hearing) an action performed
-ActionPrecept = nt('ActionPrecept', 'entity, action, object')
+class PropositionPrecept(Precept):
+    """
+    used by one agent to suggest an action take place
+    this is used to coordinate actions between agents
+    """
+    __slots__ = _fields = ('entity', 'action', 'object')
 
-# used by one agent to suggest an action take place
-# this is used to coordinate actions between agents
-PropositionPrecept = nt('PropositionPrecept', 'entity, action, object')
 
-# used to remember spoken words
-SpeechPrecept = nt('SpeechPrecept', 'entity, message')
+class SpeechPrecept(Precept):
+    """used to remember spoken words"""
+    __slots__ = _fields = ('entity', 'message')
 
-# used to store moods
-MoodPrecept = nt('MoodPrecept', 'entity, name, value')
 
+class MoodPrecept(Precept):
+    """used to store moods"""
+    __slots__ = _fields = ('entity', 'name', 'value')
@@ -0,0 +1,202 @@
+"""
+Progress of running actions, and a schedule of when they finish.
+
+The environment puts every running action in an ActionProgress.  An action
+is stored with the time it started and the time it will finish, and the
+finish times are kept in a heap.  A tick only looks at the actions that
+finish in it, and at the actions that make precepts while they run; actions
+that just take time are not touched until they are done.
+
+An action is finished when its eased progress reaches 1, or when its whole
+duration has passed.  Some easing functions overshoot, so for each easing
+function the point where it first reaches 1 is found once, with the batch
+versions in pygoap.batch_easing, and the finish time is worked out from it.
+
+progress_all() evaluates every running action's progress in one batch, for
+callers that want all of them at once (to draw them, for example).  NumPy
+is used for it if installed.  The environment does not call it each tick:
+finish times are known from finish_point, so a tick would only pay to
+evaluate actions that are not done yet.
+"""
+from collections import defaultdict
+from heapq import heappush, heappop
+from itertools import count
+
+from .actions import Action
+from .batch_easing import batch, np
+
+
+# ticks are summed from floats; finish times this close count as reached
+EPSILON = 1e-9
+
+_finish_points = dict()
+
+
+def finish_point(func, samples=1024):
+    """
+    Return the first progress in (0, 1] where func reaches 1.  Easing
+    functions that stop short of 1 (like in_sine) finish at 1.
+    """
+    try:
+        return _finish_points[func]
+    except KeyError:
+        pass
+
+    points = [i / samples for i in range(1, samples + 1)]
+    point = 1.0
+    for i, eased in enumerate(batch(func)(points)):
+        if eased >= 1.0:
+            # narrow down the crossing between the last two samples
+            low, high = points[i] - 1.0 / samples, points[i]
+            for step in range(30):
+                middle = (low + high) / 2
+                if func(middle) >= 1.0:
+                    high = middle
+                else:
+                    low = middle
+            point = high
+            break
+
+    _finish_points[func] = point
+    return point
+
+
+class ActionProgress:
+    """
+    Start time, duration and easing of running actions, scheduled by the
+    time they finish
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        self._actions = dict()      # action -> (start, end)
+        self._active = dict()       # actions that make precepts while running
+        self._heap = list()
+        self._counter = count()
+
+    def __len__(self):
+        return len(self._actions)
+
+    def __contains__(self, action):
+        return action in self._actions
+
+    def __iter__(self):
+        return iter(list(self._actions))
+
+    @property
+    def active(self):
+        """
+        Running actions that override Action.update, in the order they
+        started.  Only these need to be stepped every tick.
+        """
+        return list(self._active)
+
+    def add(self, action, start=None):
+        """
+        Start keeping time for action.  It started at start (default: now).
+        """
+        if action in self._actions:
+            return
+        if start is None:
+            start = self.time
+        end = start + action.duration * finish_point(action.easing)
+        self._actions[action] = start, end
+        if type(action).update is not Action.update:
+            self._active[action] = None
+        heappush(self._heap, (end, next(self._counter), action))
+        action._store = self
+
+    def remove(self, action):
+        """
+        Stop keeping time for action.  Its elapsed time is copied back to it.
+        Its entry on the heap is skipped when it comes up.
+        """
+        start, end = self._actions.pop(action)
+        self._active.pop(action, None)
+        action._elapsed_time = self.time - start
+        action._store = None
+
+    def elapsed(self, action):
+        return self.time - self._actions[action][0]
+
+    def progress(self, action):
+        """
+        Return the eased progress of one action
+        """
+        start = self._actions[action][0]
+        if action.duration <= 0:
+            return action.easing(1.0)
+        p = min((self.time - start) / action.duration, 1.0)
+        return action.easing(p)
+
+    def finished(self, action):
+        return self._actions[action][1] <= self.time + EPSILON
+
+    def advance(self, dt):
+        """
+        Move time forward by dt.  Return the actions that finish, and stop
+        keeping time for them.
+        """
+        self.time += dt
+        return self.due()
+
+    def due(self):
+        """
+        Return the actions that are finished by now, in the order they
+        finished, and stop keeping time for them.
+        """
+        heap = self._heap
+        actions = self._actions
+        limit = self.time + EPSILON
+        done = list()
+        while heap and heap[0][0] <= limit:
+            end, i, action = heappop(heap)
+            times = actions.get(action)
+            if times is None or times[1] != end:
+                # removed, or added again since
+                continue
+            self.remove(action)
+            done.append(action)
+        return done
+
+    def next_time(self):
+        """
+        Return the time the next action finishes, or None if none are
+        running
+        """
+        heap = self._heap
+        actions = self._actions
+        while heap:
+            end, i, action = heap[0]
+            times = actions.get(action)
+            if times is not None and times[1] == end:
+                return end
+            heappop(heap)
+        return None
+
+    def progress_all(self):
+        """
+        Return (actions, progress) for every running action, evaluating each
+        easing function once for all the actions that use it
+        """
+        actions = list(self._actions)
+        groups = defaultdict(list)
+        values = defaultdict(list)
+        now = self.time
+        for i, action in enumerate(actions):
+            start = self._actions[action][0]
+            duration = action.duration
+            p = 1.0 if duration <= 0 else min((now - start) / duration, 1.0)
+            groups[action.easing].append(i)
+            values[action.easing].append(p)
+
+        progress = [0.0] * len(actions) if np is None else \
+            np.zeros(len(actions))
+        for func, slots in groups.items():
+            eased = batch(func)(values[func])
+            if np is None:
+                for slot, value in zip(slots, eased):
+                    progress[slot] = value
+            else:
+                progress[slots] = eased
+        return actions, progress
@@ -9,14 +9,11 @@ from storymaker.english import make_english
 
 def get_known_agents(agent):
     """get all known entities at this point
-    do by checking for "name" DatumPrecepts
+    do by checking the entities the memory has precepts about
     """
-    for p in agent.memory:
-        try:
-            if p.entity is not agent:
-                yield p.entity
-        except AttributeError:
-            continue
+    for entity in agent.memory.entities():
+        if entity is not agent:
+            yield entity
 
 
 def opposite_sex(agent, other):
@@ -27,6 +24,7 @@ class GiveBirthAbility(Action):
     """
     simulate birth
     """
+    static = True
 
     def get_actions(self, parent, memory=None):
         effects = [PreceptGoal(DatumPrecept(parent, "has baby", True)),
@@ -45,6 +43,7 @@ class GestationAbility(Action):
     """
     simulate child gestation
     """
+    static = True
 
     def get_actions(self, parent, memory=None):
         effects = [PreceptGoal(DatumPrecept(parent, "ready to birth", True))]
@@ -127,13 +126,8 @@ def copulate_filter(agent, p):
 
     value = 0
 
-    to_remove = list()
-    for mp in agent.memory.of_class(MoodPrecept):
-        if mp.entity is agent and mp.name == 'content':
-            value += mp.value
-            to_remove.append(mp)
-
-    for mp in to_remove:
+    for mp in list(agent.memory.of_key(MoodPrecept, agent, 'content')):
+        value += mp.value
         agent.memory.remove(mp)
 
     if p.action == "sex":
@@ -37,10 +37,15 @@ class HeartLungs(Organ):
         self._handle = None
 
     def start(self, body):
+        # beat on the environment's clock if there is one, so beats happen
+        # in simulated time
+        clock = getattr(body, 'clock', None)
+        if clock is None:
+            clock = asyncio.get_event_loop()
+
         def trigger_update(body):
-            loop = asyncio.get_event_loop()
             next_beat = self.rate / 60.0
-            self._handle = loop.call_later(next_beat, self.beat, body)
+            self._handle = clock.call_later(next_beat, self.beat, body)
 
         if self._handle is None:
             self.trigger_update = partial(trigger_update, body)
@@ -122,6 +127,8 @@ class Human(GoapAgent):
 
     def __init__(self, *arg, **kwarg):
         super().__init__()
+        self.name = kwarg.get('name', self.name)
+        self.sex = kwarg.get('sex')
         body = Body()
         body.strength = 1.0
         body.oxygen = 1.0
@@ -140,6 +147,7 @@ class Human(GoapAgent):
         self.body = body
 
     def start(self):
+        self.body.clock = getattr(self, 'environment', None)
         for organ in list(self.body.organs.values()):
             organ.start(self.body)
 
@@ -1,15 +1,25 @@
+from operator import itemgetter
+import random
+import timeit
+
+from helpers import DummyAction, FactAbility, StaticFactAbility
+from main import build
+from pygoap import easing
 from pygoap.agent import GoapAgent
 from pygoap.actions import Action
+from pygoap.environment import Environment
+from pygoap.environment2d import Environment2D, distance2
 from pygoap.goals import *
+from pygoap.memory import MemoryManager
+from pygoap.planning import plan, regress, PlanningStats, PlanSearch
 from pygoap.precepts import *
+from pygoap.progress import ActionProgress
 
 
 def test():
-    class DummyAction(Action):
-        pass
-
     class Action0(Action):
         domain = None
+        static = True
 
         def get_actions(self, caller, memory=None):
             prereqs = [PreceptGoal(DatumPrecept(caller, "action1", True))]
@@ -19,6 +29,7 @@ def test():
 
     class Action1(Action):
         domain = None
+        static = True
 
         def get_actions(self, caller, memory=None):
             effects = [PreceptGoal(DatumPrecept(caller, "action1", True))]
@@ -27,6 +38,7 @@ def test():
 
     class Action2(Action):
         domain = None
+        static = True
 
         def get_actions(self, caller, memory=None):
             effects = [PreceptGoal(DatumPrecept(caller, "action2", True))]
@@ -35,6 +47,7 @@ def test():
 
     class Action3(Action):
         domain = None
+        static = True
 
         def get_actions(self, caller, memory=None):
             prereqs = [PreceptGoal(DatumPrecept(caller, "action0", True)),
@@ -58,8 +71,315 @@ def test():
     return agent.find_plan()
 
 
+def expansions(n, memory_size=0, ability=StaticFactAbility):
+    """
+    Exhaust the search for an unreachable goal with n independent abilities
+    """
+    agent = GoapAgent()
+    abilities = {ability(agent, "fact {}".format(i)) for i in range(n)}
+    goal = PreceptGoal(DatumPrecept(agent, "unreachable", True))
+    memory = {DatumPrecept(agent, "noise", i) for i in range(memory_size)}
+    stats = PlanningStats()
+    plan(goal, agent, None, abilities, memory, stats)
+    return stats
+
+
+def pretests(n, memory_size=300):
+    """
+    Exhaust the search for an unreachable goal with n abilities that need a
+    fact from one of the others.  Every child is pretested.
+    """
+    agent = GoapAgent()
+    abilities = {StaticFactAbility(agent, "fact 0")}
+    abilities.update(StaticFactAbility(agent, "fact {}".format(i),
+                                       "fact {}".format(i // 2))
+                     for i in range(1, n))
+    goal = PreceptGoal(MoodPrecept(agent, "unreachable", True))
+    memory = {TimePrecept(i) for i in range(memory_size)}
+    stats = PlanningStats()
+    plan(goal, agent, None, abilities, memory, stats)
+    return stats
+
+
+def bounded(n=9, budget=100):
+    """
+    Exhaust the search for an unreachable goal with n independent abilities:
+    in one call, or budget nodes at a time.  Return the time of the one call,
+    the longest slice and the number of slices.
+    """
+    agent = GoapAgent()
+    abilities = {StaticFactAbility(agent, "fact {}".format(i))
+                 for i in range(n)}
+    goal = PreceptGoal(DatumPrecept(agent, "unreachable", True))
+
+    whole = min(timeit.repeat(lambda: plan(goal, agent, None, abilities,
+                                           set()), number=1, repeat=3))
+
+    search = PlanSearch(goal, agent, None, abilities, set())
+    slices = list()
+    while not search.done:
+        slices.append(timeit.timeit(lambda: search.run(budget), number=1))
+    return whole, max(slices), len(slices)
+
+
+def narrow_goal(n, search=plan):
+    """
+    Plan for a goal at the end of a chain of 3 abilities, when the agent
+    also has n abilities that have nothing to do with it
+    """
+    agent = GoapAgent()
+    abilities = {StaticFactAbility(agent, "fact {}".format(i))
+                 for i in range(n)}
+    abilities.add(StaticFactAbility(agent, "had sex"))
+    abilities.add(StaticFactAbility(agent, "ready to birth", "had sex"))
+    abilities.add(StaticFactAbility(agent, "has baby", "ready to birth"))
+    goal = PreceptGoal(DatumPrecept(agent, "has baby", True))
+    stats = PlanningStats()
+    path = search(goal, agent, None, abilities, set(), stats)
+    assert (len(path) == 4)
+    return stats
+
+
+def deep(n, depth, heuristic=None):
+    """
+    Plan for a goal that needs `depth` of the n independent abilities
+    """
+    agent = GoapAgent()
+    abilities = {StaticFactAbility(agent, "fact {}".format(i))
+                 for i in range(n)}
+    goal = PreceptGoal(*(DatumPrecept(agent, "fact {}".format(i), True)
+                         for i in range(depth)))
+    stats = PlanningStats()
+    path = plan(goal, agent, None, abilities, set(), stats, heuristic)
+    assert (len(path) == depth + 1)
+    return stats
+
+
+def uniform(memory):
+    return 1
+
+
+def memory_lookup(size, number=1000):
+    """
+    Compare scanning the memory with the memory indexes
+    """
+    class Memory(MemoryManager):
+        max_size = size
+
+    agents = [object() for i in range(10)]
+    memory = Memory()
+    for i in range(size):
+        agent = agents[i % 10]
+        if i % 2:
+            memory.add(DatumPrecept(agent, "datum {}".format(i % 20), i))
+        else:
+            memory.add(PositionPrecept(agent, (i, i)))
+    agent = agents[3]
+
+    def scan():
+        [p for p in memory if isinstance(p, MoodPrecept)]
+        [p for p in memory if isinstance(p, DatumPrecept) and
+         p.entity is agent and p.name == "datum 3"]
+
+    def index():
+        list(memory.of_class(MoodPrecept))
+        memory.latest(DatumPrecept, agent, "datum 3")
+
+    return (min(timeit.repeat(scan, number=number, repeat=3)),
+            min(timeit.repeat(index, number=number, repeat=3)))
+
+
+def precepts(size=300, number=1000):
+    """
+    Make precepts and look them up in a set
+    """
+    agent = object()
+    memory = {DatumPrecept(agent, "datum {}".format(i), i)
+              for i in range(size)}
+    probe = [DatumPrecept(agent, "datum {}".format(i), i)
+             for i in range(size)]
+
+    def make():
+        DatumPrecept(agent, "datum 1", 1)
+
+    def lookup():
+        [p in memory for p in probe]
+
+    return (min(timeit.repeat(make, number=number * 100, repeat=3)),
+            min(timeit.repeat(lookup, number=number, repeat=3)))
+
+
+def goal_selection(goals=50, size=300, replans=1000):
+    """
+    Rank an agent's goals before each plan, when one precept changed since
+    the last plan: scoring every goal, or keeping them in a GoalSet
+    """
+
+    agent = object()
+    memory = MemoryManager(DatumPrecept(agent, "datum {}".format(i), True)
+                           for i in range(size))
+    goal_list = [PreceptGoal(DatumPrecept(agent, "goal {}".format(i), True),
+                             DatumPrecept(agent, "datum {}".format(i), True),
+                             weight=i % 7 + 1)
+                 for i in range(goals)]
+    changes = [[DatumPrecept(agent, "datum {}".format(i % size), i)]
+               for i in range(replans)]
+
+    def scan():
+        for precepts in changes:
+            s = sorted(((g.get_relevancy(memory), g) for g in goal_list),
+                       reverse=True, key=itemgetter(0))
+            s = [i for i in s if i[0] > 0]
+            s[0]
+
+    def indexed():
+        ranked = GoalSet(goal_list)
+        for precepts in changes:
+            ranked.changed(precepts)
+            next(ranked.ranked(memory))
+
+    return (min(timeit.repeat(scan, number=1, repeat=3)),
+            min(timeit.repeat(indexed, number=1, repeat=3)))
+
+
+def spatial(n, size=1000, queries=100, radius=10):
+    """
+    Compare scanning every entity with the spatial hash for radius queries
+    """
+
+    env = Environment2D(size, size)
+    entities = list(range(n))
+    for entity in entities:
+        env.set_position(entity, (random.randint(0, size),
+                                  random.randint(0, size)))
+    points = [env.get_position(random.choice(entities))
+              for i in range(queries)]
+    positions = env._positions
+    radius2 = radius * radius
+
+    def scan():
+        for point in points:
+            [e for e in entities if distance2(point, positions[e]) <= radius2]
+
+    def grid():
+        for point in points:
+            env.objects_near(point, radius)
+
+    return (min(timeit.repeat(scan, number=1, repeat=3)),
+            min(timeit.repeat(grid, number=1, repeat=3)))
+
+
+def reach(dist=100, size=256, queries=100):
+    """
+    Compare the old can_move_from double loop with Reachable sets
+    """
+
+    env = Environment2D(size, size)
+    for i in range(size * size // 5):
+        env.grid.block((random.randrange(size), random.randrange(size)))
+    points = [(random.randrange(size), random.randrange(size))
+              for i in range(queries)]
+
+    def loop():
+        for x, y in points:
+            pos = list()
+            for xx in range(x - dist, x + dist):
+                for yy in range(y - dist, y + dist):
+                    if distance2((xx, yy), (x, y)) <= dist:
+                        pos.append((env, (xx, yy)))
+
+    def masks():
+        for point in points:
+            env.reachable(point, dist)
+
+    return (min(timeit.repeat(loop, number=1, repeat=3)),
+            min(timeit.repeat(masks, number=1, repeat=3)))
+
+
+def action_progress(n=5000, ticks=100):
+    """
+    Run n actions for some ticks: checking each action every tick, or
+    scheduling them by finish time
+    """
+
+    agent = GoapAgent()
+    functions = (easing.linear, easing.in_out_quad, easing.out_bounce)
+
+    def make():
+        actions = list()
+        for i in range(n):
+            action = Action(agent)
+            action._duration = i % 150 + 1
+            action.easing = functions[i % 3]
+            actions.append(action)
+        return actions
+
+    def scalar():
+        running = make()
+        for tick in range(ticks):
+            for action in running:
+                action.step(1)
+            running = [a for a in running if not a.finished]
+
+    def scheduled():
+        store = ActionProgress()
+        for action in make():
+            store.add(action)
+        for tick in range(ticks):
+            store.advance(1)
+
+    return (min(timeit.repeat(scalar, number=1, repeat=3)),
+            min(timeit.repeat(scheduled, number=1, repeat=3)))
+
+
+def story_time(hours=6):
+    """
+    Simulate the story in main.py for some hours of story time: ticking
+    every second, or running events
+    """
+
+    seconds = hours * 3600
+
+    def make():
+        env = build()
+        env.start()
+        return env
+
+    def ticking():
+        env = make()
+        for tick in range(seconds):
+            env.update(1)
+
+    def events():
+        make().run(until=seconds)
+
+    return (min(timeit.repeat(ticking, number=1, repeat=3)),
+            min(timeit.repeat(events, number=1, repeat=3)))
+
+
+class ChatterAction(Action):
+    default_duration = 10 ** 9
+
+    def update(self, dt):
+        yield DatumPrecept(self.parent, "chatter", True)
+
+
+def ticks(agents=100, number=100):
+    """
+    Run ticks where every agent has a running action that emits a precept
+    """
+
+    env = Environment()
+    for i in range(agents):
+        agent = GoapAgent()
+        env.add(agent)
+        agent.apply_plan([[ChatterAction(agent)]])
+
+    return number / min(timeit.repeat(lambda: env.update(1), number=number,
+                                      repeat=3))
+
+
 if __name__ == '__main__':
-    import timeit
 
     # .58   initial // no action instanced
     # .61   action / operation change
@@ -68,3 +388,97 @@ if __name__ == '__main__':
     print((test()))
     print((min(timeit.repeat("test()", number=1000, repeat=10,
                              setup="from __main__ import test"))))
+
+    # nodes expanded, without duplicate detection:
+    #   4: 65   5: 326   6: 1957   7: 13700
+    for n in range(4, 11):
+        print(n, expansions(n))
+    print((min(timeit.repeat("expansions(7)", number=10, repeat=3,
+                             setup="from __main__ import expansions"))))
+
+    # 300 precepts in memory
+    # .079  copy memory for each planning node
+    # .057  memory layers
+    # .034  goal is only tested when a type it needs changed
+    # .023  static abilities
+    print((min(timeit.repeat("expansions(7, 300)", number=10, repeat=3,
+                             setup="from __main__ import expansions"))))
+
+    # expansions(7): actions made for each node, or once (static abilities)
+    # (.026, .013)
+    print(tuple(min(timeit.repeat(lambda: expansions(7, 0, ability),
+                                  number=10, repeat=3))
+                for ability in (FactAbility, StaticFactAbility)))
+
+    # pretests, 12 abilities with prereqs, 300 precepts in memory
+    # .0123  each pretest looks at every precept in memory
+    # .0055  nodes keep the precept types in memory and changed since the
+    #        parent; the goal is only tested when one of its types changed
+    # .0026  static abilities
+    print((min(timeit.repeat("pretests(12)", number=1, repeat=3,
+                             setup="from __main__ import pretests"))))
+
+    # deep plans: uniform cost (h == 1) vs. the goal's heuristic
+    for n, depth in ((8, 4), (10, 6), (12, 8)):
+        for name, h in (("uniform", uniform), ("goal", None)):
+            t = min(timeit.repeat(lambda: deep(n, depth, h),
+                                  number=1, repeat=3))
+            print(n, depth, name, deep(n, depth, h), round(t, 4))
+
+    # narrow goal, 3 actions deep, n other abilities: plan vs. regress
+    #  4: plan expands 17, .00033   regress expands 3, .00010
+    #  8: plan expands 47, .00114   regress expands 3, .00013
+    # 12: plan expands 93, .00299   regress expands 3, .00017
+    # 16: plan expands 155, .00744  regress expands 3, .00019
+    for n in (4, 8, 12, 16):
+        for name, search in (("plan", plan), ("regress", regress)):
+            t = min(timeit.repeat(lambda: narrow_goal(n, search),
+                                  number=1, repeat=3))
+            print(n, name, narrow_goal(n, search), round(t, 5))
+
+    # exhaust 9 abilities (512 nodes): (one call, longest 100 node slice,
+    # slices)
+    # (.0063, .0017, 6)
+    print(bounded())
+
+    # memory: scan vs. index (of_class + latest), 1000 lookups
+    for size in (30, 300, 3000, 10000):
+        print(size, memory_lookup(size))
+
+    # precepts: (100000 creations, 1000 lookups of 300 precepts)
+    # (.040, .027)  namedtuple
+    # (.040, .008)  interned, identity hash
+    print(precepts())
+
+    # 1000 goal rankings, 50 goals: (score every goal, GoalSet)
+    # (.018, .0016)
+    print(goal_selection())
+
+    # 100 vision queries on a 1000x1000 map: (scan, spatial hash)
+    for n in (1000, 5000, 10000):
+        print(n, spatial(n))
+
+    # 100 can_move_from(dist=100) calls on a 256x256 map: (loop, masks)
+    # (.553, .0094)  the loop also ignored obstacles and the map edges
+    print(reach())
+
+    # 100 ticks of 5000 actions: (each action every tick, ActionProgress)
+    # (.139, .030)   easing evaluated in a batch every tick
+    # (.139, .0061)  actions scheduled by finish time
+    print(action_progress())
+
+    # 6 hours of the story in main.py: (env.update(1) ticks, env.run)
+    # 5 hearts beat once a second either way; env.run only calls them
+    # (.949, .108)
+    print(story_time())
+
+    # ticks per second, 100 agents
+    # 380   queue.Queue
+    # 520   lists swapped per tick
+    # 640   actions scheduled by finish time
+    # 119   agents learn the precepts; filter_precept used to drop them all
+    # 307   no filters: precepts are added to delta in one loop
+    # 270   process and process_list share _learn
+    # 820   delta is an OrderedDict instead of a MemoryManager
+    # 860   actions are queued when a plan is given, not every tick
+    print(ticks())
@@ -0,0 +1,223 @@
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+
+from headless import run
+from helpers import DummyAction, FactAbility
+from pygoap.actions import Action
+from pygoap.agent import GoapAgent
+from pygoap.environment import Environment
+from pygoap.environment2d import Environment2D, SpatialHash
+from pygoap.goals import *
+from pygoap.precepts import *
+
+
+def build(n):
+    env = Environment()
+    for i in range(n):
+        agent = GoapAgent()
+        agent.name = "agent {}".format(i)
+        facts = [str(j) for j in range(i % 4 + 1)]
+        previous = None
+        for fact in facts:
+            agent.abilities.add(FactAbility(agent, fact, previous))
+            previous = fact
+        agent.goals.add(PreceptGoal(DatumPrecept(agent, previous, True)))
+        env.add(agent)
+    return env
+
+
+class PlanningPhaseTests(unittest.TestCase):
+    def test_executor_matches_serial(self):
+        serial = build(8)
+        serial.handle_planning()
+
+        threaded = build(8)
+        with ThreadPoolExecutor(4) as executor:
+            threaded.executor = executor
+            threaded.handle_planning()
+
+        for a, b in zip(serial.agents, threaded.agents):
+            self.assertEqual(a.name, b.name)
+            self.assertEqual(len(a.plan), len(b.plan))
+            self.assertEqual(len(a.plan), int(a.name.split()[1]) % 4 + 1)
+
+
+class SpatialHashTests(unittest.TestCase):
+    def setUp(self):
+        self.grid = SpatialHash(4)
+        self.points = {i: (i * 3 % 50, i * 7 % 50) for i in range(100)}
+        for entity, position in self.points.items():
+            self.grid.move(entity, position)
+
+    def brute(self, position, radius):
+        return {e for e, (x, y) in self.points.items()
+                if (x - position[0]) ** 2 + (y - position[1]) ** 2 <=
+                radius ** 2}
+
+    def test_in_radius(self):
+        for position, radius in (((0, 0), 5), ((25, 25), 10), ((49, 3), 7)):
+            self.assertEqual(set(self.grid.in_radius(position, radius)),
+                             self.brute(position, radius))
+
+    def test_in_rect(self):
+        found = set(self.grid.in_rect(10, 10, 20, 30))
+        expected = {e for e, (x, y) in self.points.items()
+                    if 10 <= x <= 20 and 10 <= y <= 30}
+        self.assertEqual(found, expected)
+
+    def test_move_and_remove(self):
+        self.grid.move(0, (40, 40))
+        self.assertIn(0, self.grid.at((40, 40)))
+        self.assertNotIn(0, self.grid.in_radius((0, 0), 1))
+        self.grid.remove(0)
+        self.assertNotIn(0, self.grid.at((40, 40)))
+        self.assertEqual(len(self.grid), 99)
+
+
+class Environment2DTests(unittest.TestCase):
+    def test_look_is_limited_to_vision_radius(self):
+        env = Environment2D(100, 100)
+        near, far = GoapAgent(), GoapAgent()
+        env.add(near, (0, 0))
+        env.add(far, (50, 50))
+        seen = list()
+        near.process = seen.append
+        env.look(near)
+        self.assertEqual(seen, [PositionPrecept(near, (0, 0))])
+        self.assertEqual(env.objects_near((48, 48), 5), [far])
+        self.assertEqual(env.objects_at((50, 50)), [far])
+
+    def test_pathfind_cache_and_flow_field(self):
+        env = Environment2D(20, 20)
+        for y in range(15):
+            env.grid.block((10, y))
+
+        path = env.pathfind((0, 0), (19, 0))
+        self.assertEqual(env.pathfind((0, 0), (19, 0)), path)
+        self.assertEqual(env.path_cache.hits, 1)
+
+        # a popular goal gets a flow field with paths of the same cost
+        for i in range(env.flow_field_requests):
+            env.pathfind((0, 0), (19, 0))
+        self.assertIn((19, 0), env._fields)
+        self.assertEqual(len(env.pathfind((0, 0), (19, 0))), len(path))
+        self.assertEqual(env.next_step((0, 0), (19, 0)), path[1])
+
+        # the wall is closed; nothing stale is returned
+        env.grid.block((10, 15))
+        for y in range(16, 20):
+            env.grid.block((10, y))
+        self.assertEqual(env.pathfind((0, 0), (19, 0)), [])
+        self.assertEqual(env.pathfind((0, 0), (19, 1)), [])
+        self.assertIsNone(env.next_step((0, 0), (19, 0)))
+
+
+class InterestManagementTests(unittest.TestCase):
+    def setUp(self):
+        self.env = Environment2D(100, 100)
+        self.agents = [GoapAgent() for i in range(3)]
+        self.inbox = {agent: list() for agent in self.agents}
+        for i, agent in enumerate(self.agents):
+            self.env.add(agent, (i * 40, 0))
+            agent.process_list = self.inbox[agent].extend
+
+    def test_unsubscribed_agents_get_everything(self):
+        precepts = {TimePrecept(1), SpeechPrecept(self.agents[0], "hi")}
+        self.env.broadcast_precepts(precepts)
+        for agent in self.agents:
+            self.assertEqual(set(self.inbox[agent]), precepts)
+        self.assertEqual(self.env.precepts_dropped, 0)
+
+    def test_routing(self):
+        a, b, c = self.agents
+        env = self.env
+        env.subscribe(a, types=[TimePrecept])
+        env.subscribe(b, entities=[c])
+        env.subscribe(c, radius=5)
+        speech = SpeechPrecept(c, "hi")
+        far = SpeechPrecept(a, "hello")
+        env.broadcast_precepts([TimePrecept(1), speech, far])
+        self.assertEqual(self.inbox[a], [TimePrecept(1)])
+        self.assertEqual(self.inbox[b], [speech])
+        self.assertEqual(self.inbox[c], [speech])
+        self.assertEqual(env.precepts_delivered, 3)
+        self.assertEqual(env.precepts_dropped, 6)
+
+    def test_unsubscribe(self):
+        a = self.agents[0]
+        self.env.subscribe(a, types=[TimePrecept], radius=5)
+        self.env.unsubscribe(a)
+        self.env.broadcast_precepts([SpeechPrecept(a, "hi")])
+        self.assertEqual(self.inbox[a], [SpeechPrecept(a, "hi")])
+
+
+class LongAction(Action):
+    default_duration = 100.0
+
+
+class EventClockTests(unittest.TestCase):
+    def setUp(self):
+        self.env = Environment()
+        self.agent = GoapAgent()
+        self.agent.name = "agent"
+        self.env.add(self.agent)
+        self.calls = list()
+
+    def record(self, name):
+        self.calls.append((name, self.env.time))
+
+    def test_call_later(self):
+        env = self.env
+        env.call_later(2, self.record, "b")
+        env.call_later(1, self.record, "a")
+        env.call_later(1.5, self.record, "x").cancel()
+        env.call_at(3, self.record, "c")
+        for i in range(3):
+            env.update(1)
+        self.assertEqual(self.calls, [("a", 1), ("b", 2), ("c", 3)])
+        self.assertIsNone(env.next_event())
+
+    def test_run_jumps_to_events(self):
+        env = self.env
+        action = LongAction(self.agent)
+        self.agent.apply_plan([[action]])
+        env.call_later(30, self.record, "event")
+        updates = env.run()
+        self.assertEqual(self.calls, [("event", 30)])
+        self.assertEqual(env.time, 100)
+        self.assertNotIn(action, env.progress)
+        self.assertLess(updates, 5)
+
+    def test_run_until(self):
+        env = self.env
+        first, second = DummyAction(self.agent), DummyAction(self.agent)
+        self.agent.apply_plan([[second], [first]])
+        env.run(until=1.5)
+        self.assertEqual(env.time, 1.5)
+        self.assertNotIn(first, env.progress)
+        # the next action starts when the first one finished
+        self.assertEqual(second.elapsed_teme, .5)
+
+
+class HeadlessTests(unittest.TestCase):
+    def test_ticks(self):
+        env = build(4)
+        report = run(env, ticks=10)
+        self.assertEqual(report.ticks, 10)
+        self.assertEqual(env.time, 10)
+        self.assertGreaterEqual(report.plans, 4)
+        self.assertEqual(report.precepts, 40)
+
+    def test_condition(self):
+        env = build(4)
+        report = run(env, condition=lambda env: env.time >= 3)
+        self.assertTrue(report.stopped)
+        self.assertEqual(report.ticks, 3)
+
+    def test_agents_learn_precepts(self):
+        env = build(1)
+        agent = next(env.agents)
+        precept = DatumPrecept(agent, "seen", True)
+        env.post_precept(precept)
+        env.update(1)
+        self.assertIn(precept, agent.memory)
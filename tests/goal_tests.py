@@ -136,3 +136,71 @@ class NeverValidGoalTests(unittest.TestCase):
 
     def test_touch(self):
         pass
+
+
+class CountingGoal(PreceptGoal):
+    scored = 0
+
+    def get_relevancy(self, memory):
+        CountingGoal.scored += 1
+        return super().get_relevancy(memory)
+
+
+class GoalSetTests(unittest.TestCase):
+    def setUp(self):
+        CountingGoal.scored = 0
+        self.memory = MemoryManager()
+        self.a = CountingGoal(DatumPrecept(1, "a", True), weight=2.0)
+        self.b = CountingGoal(DatumPrecept(1, "b", True))
+        self.c = CountingGoal(DatumPrecept(1, "c", True), weight=3.0)
+        self.goals = GoalSet([self.a, self.b, self.c])
+
+    def ranked(self):
+        return [goal for score, goal in self.goals.ranked(self.memory)]
+
+    def test_ranked(self):
+        self.assertEqual(self.ranked(), [self.c, self.a, self.b])
+        # ranking again leaves the order alone
+        self.assertEqual(self.ranked(), [self.c, self.a, self.b])
+        self.assertEqual(CountingGoal.scored, 3)
+
+    def test_irrelevant_goals_are_left_out(self):
+        precept = DatumPrecept(1, "c", True)
+        self.memory.add(precept)
+        self.goals.changed([precept])
+        self.assertEqual(self.ranked(), [self.a, self.b])
+
+    def test_only_changed_goals_are_scored(self):
+        self.ranked()
+        precepts = [DatumPrecept(1, "a", True), DatumPrecept(2, "b", True)]
+        self.memory.update(precepts)
+        self.goals.changed(precepts)
+        self.assertEqual(self.ranked(), [self.c, self.b])
+        self.assertEqual(CountingGoal.scored, 4)
+
+    def test_add_and_remove(self):
+        self.ranked()
+        self.goals.remove(self.c)
+        d = CountingGoal(DatumPrecept(1, "d", True), weight=5.0)
+        self.goals.add(d)
+        self.assertEqual(self.ranked(), [d, self.a, self.b])
+        self.assertEqual(len(self.goals), 3)
+
+    def test_undeclared_goals_are_scored_every_time(self):
+        goal = EvalGoal("1 > 2")
+        self.goals.add(goal)
+        self.assertIn(goal, self.ranked())
+        goal.condition = "1 < 2"
+        self.assertNotIn(goal, self.ranked())
+
+    def test_remove_clears_index(self):
+        for goal in (self.a, self.b, self.c):
+            self.goals.remove(goal)
+        self.assertEqual(self.goals._by_type, {})
+        self.assertEqual(self.goals._by_key, {})
+
+    def test_weighted_goals(self):
+        goal = WeightedGoal(weight=1.5)
+        self.goals.add(goal)
+        self.goals.changed([TimePrecept(1)])
+        self.assertEqual(self.ranked(), [self.c, self.a, goal, self.b])
@@ -0,0 +1,32 @@
+"""
+actions shared by the tests and benchmarks
+"""
+from pygoap.actions import Action
+from pygoap.goals import PreceptGoal
+from pygoap.precepts import DatumPrecept
+
+
+class DummyAction(Action):
+    pass
+
+
+class FactAbility(Action):
+    """
+    Ability that learns a fact, after the fact it needs if one is given
+    """
+
+    def __init__(self, parent, fact, needs=None):
+        super().__init__(parent)
+        self.fact = fact
+        self.needs = needs
+
+    def get_actions(self, caller, memory=None):
+        prereqs = None
+        if self.needs is not None:
+            prereqs = [PreceptGoal(DatumPrecept(caller, self.needs, True))]
+        effects = [PreceptGoal(DatumPrecept(caller, self.fact, True))]
+        yield DummyAction(caller, prereqs, effects)
+
+
+class StaticFactAbility(FactAbility):
+    static = True
@@ -0,0 +1,118 @@
+from copy import copy
+import unittest
+
+from pygoap.agent import GoapAgent
+from pygoap.memory import *
+from pygoap.precepts import *
+
+
+class MemoryManagerIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.a = object()
+        self.b = object()
+        self.memory = MemoryManager()
+        self.memory.update([TimePrecept(1),
+                            DatumPrecept(self.a, "name", "a"),
+                            DatumPrecept(self.a, "married", False),
+                            MoodPrecept(self.a, "content", .5),
+                            PositionPrecept(self.b, (0, 0))])
+
+    def test_of_class(self):
+        self.assertEqual(len(list(self.memory.of_class(DatumPrecept))), 2)
+        self.assertEqual(len(list(self.memory.of_class(object))), 5)
+
+    def test_of_entity(self):
+        self.assertEqual(len(list(self.memory.of_entity(self.a))), 3)
+        self.assertEqual(set(self.memory.entities()), {self.a, self.b})
+
+    def test_latest(self):
+        memory = self.memory
+        memory.add(DatumPrecept(self.a, "married", True))
+        latest = memory.latest(DatumPrecept, self.a, "married")
+        self.assertEqual(latest.value, True)
+        memory.add(DatumPrecept(self.a, "married", False))
+        latest = memory.latest(DatumPrecept, self.a, "married")
+        self.assertEqual(latest.value, False)
+        self.assertIsNone(memory.latest(MoodPrecept, self.a, "married"))
+
+    def test_remove_updates_indexes(self):
+        memory = self.memory
+        memory.remove(PositionPrecept(self.b, (0, 0)))
+        memory.discard(TimePrecept(1))
+        self.assertEqual(set(memory.entities()), {self.a})
+        self.assertEqual(list(memory.of_class(TimePrecept)), [])
+        while memory:
+            memory.pop()
+        self.assertEqual(list(memory.entities()), [])
+        self.assertIsNone(memory.latest(DatumPrecept, self.a, "name"))
+
+    def test_inplace_operators(self):
+        memory = self.memory
+        memory -= {TimePrecept(1)}
+        memory |= {TimePrecept(2)}
+        self.assertEqual(list(memory.of_class(TimePrecept)), [TimePrecept(2)])
+        memory &= {TimePrecept(2)}
+        self.assertEqual(list(memory.entities()), [])
+
+
+class EvictionTests(unittest.TestCase):
+    def fill(self, memory, n):
+        for i in range(n):
+            memory.add(TimePrecept(i))
+
+    def test_oldest_first(self):
+        memory = MemoryManager(max_size=3)
+        self.fill(memory, 5)
+        self.assertEqual(memory, {TimePrecept(2), TimePrecept(3),
+                                  TimePrecept(4)})
+
+    def test_least_recently_used(self):
+        memory = MemoryManager(max_size=3, policy=LeastRecentlyUsed())
+        self.fill(memory, 3)
+        memory.add(TimePrecept(0))
+        memory.add(TimePrecept(3))
+        self.assertEqual(memory, {TimePrecept(0), TimePrecept(2),
+                                  TimePrecept(3)})
+
+    def test_pinned(self):
+        memory = MemoryManager(max_size=3)
+        memory.pin(TimePrecept(0))
+        self.fill(memory, 5)
+        self.assertIn(TimePrecept(0), memory)
+        self.assertEqual(len(memory), 3)
+
+    def test_type_quota(self):
+        policy = TypeQuota({TimePrecept: 2})
+        memory = MemoryManager(max_size=10, policy=policy)
+        memory.add(DatumPrecept(None, "a", 1))
+        self.fill(memory, 5)
+        self.assertEqual(memory, {DatumPrecept(None, "a", 1),
+                                  TimePrecept(3), TimePrecept(4)})
+
+    def test_copy_keeps_settings(self):
+        memory = MemoryManager(max_size=3)
+        memory.pin(TimePrecept(0))
+        self.fill(memory, 3)
+        other = copy(memory)
+        self.assertEqual(other, memory)
+        self.assertEqual(other.max_size, 3)
+        self.fill(other, 6)
+        self.assertIn(TimePrecept(0), other)
+
+    def test_copy_keeps_order(self):
+        memory = MemoryManager(max_size=20)
+        for i in range(20):
+            memory.add(DatumPrecept(None, i, i))
+        other = copy(memory)
+        other.max_size = 5
+        other.add(DatumPrecept(None, "new", 0))
+        self.assertNotIn(DatumPrecept(None, 0, 0), other)
+        self.assertIn(DatumPrecept(None, 1, 1), other)
+
+    def test_agent_forgets_oldest(self):
+        agent = GoapAgent()
+        agent.memory.max_size = 5
+        precepts = [DatumPrecept(agent, i, i) for i in range(20)]
+        agent.process_list(precepts)
+        agent.apply_plan(list())
+        self.assertEqual(agent.memory, set(precepts[-5:]))
@@ -0,0 +1,213 @@
+import random
+import sys
+import timeit
+
+from pathfinding.astar import astar
+from pathfinding.cache import PathCache
+from pathfinding.dstar import DStarLite
+from pathfinding.flowfield import FlowField
+from pathfinding.grid import Grid
+from pathfinding.hpa import HierarchicalMap
+from pathfinding.jps import jps
+
+
+def make_map(size, density=.2, seed=0):
+    """
+    Random map with a fraction of cells blocked; corners are left open
+    """
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    for i in range(int(size * size * density)):
+        grid.block((rng.randrange(size), rng.randrange(size)))
+    for x in range(3):
+        for y in range(3):
+            grid.unblock((x, y))
+            grid.unblock((size - 1 - x, size - 1 - y))
+    return grid
+
+
+def open_cell(grid, rng):
+    while 1:
+        position = rng.randrange(grid.width), rng.randrange(grid.height)
+        if not grid.is_blocked(position):
+            return position
+
+
+def queries(grid, number=20, seed=1):
+    rng = random.Random(seed)
+    return [(open_cell(grid, rng), open_cell(grid, rng))
+            for i in range(number)]
+
+
+def bench(name, grid, find, pairs):
+    def run():
+        for start, finish in pairs:
+            find(grid, start, finish)
+
+    t = min(timeit.repeat(run, number=1, repeat=3))
+    found = sum(1 for start, finish in pairs if find(grid, start, finish))
+    print("{:>24} {:>6}x{:<6} {:>9.2f} ms/query {:>4}/{} found".format(
+        name, grid.width, grid.height, t * 1000 / len(pairs), found,
+        len(pairs)))
+
+
+def footprint(hpa):
+    """
+    Bytes used by the abstract graph; the ints and floats are counted too
+    """
+    size = sys.getsizeof
+    total = size(hpa.edges) + size(hpa.cluster_nodes)
+    for node, edges in hpa.edges.items():
+        total += size(node) + size(edges)
+        total += sum(size(k) + size(v) for k, v in edges.items())
+    for nodes in hpa.cluster_nodes.values():
+        total += size(nodes)
+    return total
+
+
+def precompute(grid, cluster_size=16):
+    """
+    Build a HierarchicalMap and report how long it took and its size
+    """
+    t = timeit.default_timer()
+    hpa = HierarchicalMap(grid, cluster_size)
+    t = timeit.default_timer() - t
+    print("{:>24} {:>6}x{:<6} {:>9.2f} s   {:>6.1f} MB  {!r}".format(
+        "hpa* precompute", grid.width, grid.height, t,
+        footprint(hpa) / 2 ** 20, hpa))
+    return hpa
+
+
+def update(hpa, position):
+    """
+    Change one cell and report how long the HierarchicalMap takes to catch up
+    """
+    grid = hpa.grid
+    grid.set_cost(position, grid.cost(position) + 1.0)
+    t = timeit.default_timer()
+    hpa.build()
+    t = timeit.default_timer() - t
+    print("{:>24} {:>6}x{:<6} {:>9.2f} ms".format(
+        "hpa* one cell changed", grid.width, grid.height, t * 1000))
+
+
+def crowd(size, agents=100):
+    """
+    Many agents heading for one goal, for two ticks
+    """
+    grid = make_map(size)
+    rng = random.Random(2)
+    goal = open_cell(grid, rng)
+    starts = [open_cell(grid, rng) for i in range(agents)]
+
+    def search():
+        for tick in range(2):
+            for start in starts:
+                jps(grid, start, goal)
+
+    def cached():
+        cache = PathCache(jps)
+        for tick in range(2):
+            for start in starts:
+                cache.path(grid, start, goal)
+
+    def field():
+        field = FlowField(grid, goal)
+        for tick in range(2):
+            for start in starts:
+                field.next_step(start)
+
+    for name, func in (("jps", search), ("path cache", cached),
+                       ("flow field", field)):
+        t = min(timeit.repeat(func, number=1, repeat=3))
+        print("{:>24} {:>6}x{:<6} {:>9.2f} ms for {} agents, 2 ticks".format(
+            "crowd " + name, size, size, t * 1000, agents))
+
+
+def replan(size, near, ticks=50, edits=3):
+    """
+    Walk an agent corner to corner while a few cells change every tick.
+    Compare repairing the path with searching again.  If near is true, the
+    changes are just ahead of the agent; otherwise anywhere on the map.
+    """
+    grid = make_map(size)
+    rng = random.Random(3)
+    goal = size - 1, size - 1
+    position = 0, 0
+    planner = DStarLite(grid, position, goal)
+    t = timeit.default_timer()
+    path = planner.path()
+    initial = timeit.default_timer() - t
+
+    repair = search = 0.0
+    done = 0
+    for tick in range(ticks):
+        if len(path) < 2:
+            break
+        position = path[1]
+        planner.move(position)
+        for i in range(edits):
+            if near:
+                x, y = path[min(rng.randrange(2, 12), len(path) - 1)]
+                cell = (min(max(x + rng.randrange(-2, 3), 0), size - 1),
+                        min(max(y + rng.randrange(-2, 3), 0), size - 1))
+            else:
+                cell = rng.randrange(size), rng.randrange(size)
+            if cell == position or cell == goal:
+                continue
+            if grid.is_blocked(cell):
+                grid.unblock(cell)
+            else:
+                grid.block(cell)
+
+        t = timeit.default_timer()
+        path = planner.path()
+        repair += timeit.default_timer() - t
+        t = timeit.default_timer()
+        astar(grid, position, goal)
+        search += timeit.default_timer() - t
+        done += 1
+
+    print("{:>24} {:>6}x{:<6} {:>9.2f} ms repair {:>9.2f} ms a*   "
+          "(first search {:.0f} ms)".format(
+              "d* lite " + ("near" if near else "anywhere"), size, size,
+              repair * 1000 / done, search * 1000 / done, initial * 1000))
+
+
+if __name__ == '__main__':
+    # 100 agents going to one goal for two ticks:
+    #   256   jps 1411ms    path cache  706ms    flow field   93ms
+    #   1024  jps 15.6s     path cache  7.8s     flow field  1.7s
+    # the flow field time is almost all building; reading a step is O(1)
+    crowd(256)
+
+    # walking corner to corner with 3 cells toggled each tick, ms/tick:
+    #   256   near the agent: repair 20,  a* 43;  anywhere: repair 2,  a* 40
+    #   1024  near the agent: repair 397, a* 849; anywhere: repair 50, a* 872
+    # the first d* lite search costs about 5x an a* search
+    replan(256, near=True)
+    replan(256, near=False)
+
+    # 20% of cells blocked, ms/query (corner to corner / random):
+    #   256   a*   43 / 6.5    jps  37 / 4.9    hpa*  10 / 3.0
+    #   1024  a*  873 / 147    jps 754 / 116    hpa* 190 / 31
+    #
+    # hpa* precompute: 1.5s and 5.8MB at 256, 26s and 100MB at 1024.
+    # after one cell changes, catching up takes 31ms at either size; it was
+    # the whole precompute before clusters were built again on their own.
+    # a* and jps find the cheapest path; hpa* paths cost about 3% more.
+    # with 2% blocked, jps takes 2.4ms per random query at 256 (a*: 4.1)
+    for size in (256, 1024):
+        grid = make_map(size)
+        corner = [((0, 0), (size - 1, size - 1))]
+        pairs = queries(grid)
+        bench("a* corner to corner", grid, astar, corner)
+        bench("a* random", grid, astar, pairs)
+        bench("jps corner to corner", grid, jps, corner)
+        bench("jps random", grid, jps, pairs)
+
+        hpa = precompute(grid)
+        update(hpa, (size // 2, size // 2))
+        bench("hpa* corner to corner", grid,
+              lambda grid, a, b: hpa.path(a, b), corner)
+        bench("hpa* random", grid, lambda grid, a, b: hpa.path(a, b), pairs)
@@ -0,0 +1,323 @@
+import random
+import unittest
+
+from pathfinding.astar import astar, search
+from pathfinding.cache import PathCache
+from pathfinding.dstar import DStarLite
+from pathfinding.flowfield import FlowField
+from pathfinding.grid import Grid, BLOCKED
+from pathfinding.hpa import HierarchicalMap
+from pathfinding.jps import jps
+from pathfinding.reach import Reachable, disc
+
+
+area = [[0, 1, 0, 0, 0],
+        [0, 1, 0, 1, 0],
+        [0, 1, 0, 1, 0],
+        [0, 0, 0, 1, 0],
+        [1, 1, 1, 1, 0]]
+
+
+def random_map(size, seed):
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    for i in range(size * size // 4):
+        grid.block((rng.randrange(size), rng.randrange(size)))
+    grid.unblock((0, 0))
+    return grid
+
+
+def cost(grid, path):
+    total = 0.0
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        step = 2 ** .5 if x0 != x1 and y0 != y1 else 1.0
+        total += step * grid.cost((x1, y1))
+    return total
+
+
+class AStarTests(unittest.TestCase):
+    def test_avoids_obstacles(self):
+        grid = Grid.from_rows(area)
+        path = astar(grid, (0, 0), (4, 4))
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (4, 4))
+        for position in path:
+            self.assertFalse(grid.is_blocked(position))
+
+    def test_no_corner_cutting(self):
+        grid = Grid.from_rows(area)
+        path = astar(grid, (0, 0), (4, 4))
+        for (x0, y0), (x1, y1) in zip(path, path[1:]):
+            if x0 != x1 and y0 != y1:
+                self.assertFalse(grid.is_blocked((x0, y1)))
+                self.assertFalse(grid.is_blocked((x1, y0)))
+
+    def test_unreachable(self):
+        grid = Grid.from_rows(area)
+        grid.block((4, 3))
+        grid.block((3, 0))
+        self.assertEqual(astar(grid, (0, 0), (4, 4)), [])
+        self.assertEqual(astar(grid, (0, 0), (1, 0)), [])
+        self.assertEqual(astar(grid, (0, 0), (9, 9)), [])
+
+    def test_optimal_on_open_grid(self):
+        grid = Grid(10, 10)
+        path = astar(grid, (0, 0), (9, 4))
+        self.assertAlmostEqual(cost(grid, path), 5 + 4 * 2 ** .5)
+
+    def test_costs(self):
+        grid = Grid(5, 3)
+        for x in range(1, 4):
+            grid.set_cost((x, 1), 10)
+        path = astar(grid, (0, 1), (4, 1))
+        self.assertNotIn((2, 1), path)
+
+    def test_search_compat(self):
+        path = search((0, 0), (5, 9), (0, 0), (10, 10))
+        self.assertEqual(path[0], (5, 9))
+        self.assertEqual(path[-1], (0, 0))
+        self.assertEqual(len(path), 10)
+
+    def test_version(self):
+        grid = Grid(3, 3)
+        grid.block((1, 1))
+        grid.block((1, 1))
+        self.assertEqual(grid.version, 1)
+
+
+class JPSTests(unittest.TestCase):
+    def test_same_cost_as_astar(self):
+        for seed in range(20):
+            grid = random_map(24, seed)
+            rng = random.Random(seed)
+            finish = rng.randrange(24), rng.randrange(24)
+            grid.unblock(finish)
+            expected = astar(grid, (0, 0), finish)
+            path = jps(grid, (0, 0), finish)
+            self.assertEqual(bool(path), bool(expected))
+            self.assertAlmostEqual(cost(grid, path), cost(grid, expected))
+
+    def test_path_is_connected(self):
+        grid = Grid.from_rows(area)
+        path = jps(grid, (0, 0), (4, 4))
+        self.assertEqual(path, astar(grid, (0, 0), (4, 4)))
+
+    def test_unreachable(self):
+        grid = Grid.from_rows(area)
+        grid.block((4, 3))
+        self.assertEqual(jps(grid, (0, 0), (4, 4)), [])
+
+
+class HierarchicalMapTests(unittest.TestCase):
+    def assertValid(self, grid, path, start, finish):
+        self.assertEqual(path[0], start)
+        self.assertEqual(path[-1], finish)
+        for (x0, y0), (x1, y1) in zip(path, path[1:]):
+            self.assertEqual(max(abs(x1 - x0), abs(y1 - y0)), 1)
+            self.assertFalse(grid.is_blocked((x1, y1)))
+
+    def test_paths(self):
+        grid = random_map(48, 1)
+        hpa = HierarchicalMap(grid, cluster_size=8)
+        rng = random.Random(1)
+        for i in range(20):
+            finish = rng.randrange(48), rng.randrange(48)
+            grid.unblock(finish)
+            expected = astar(grid, (0, 0), finish)
+            path = hpa.path((0, 0), finish)
+            self.assertEqual(bool(path), bool(expected))
+            if path:
+                self.assertValid(grid, path, (0, 0), finish)
+                self.assertLess(cost(grid, path), cost(grid, expected) * 1.5)
+
+    def test_rebuilds_when_grid_changes(self):
+        grid = Grid(32, 8)
+        hpa = HierarchicalMap(grid, cluster_size=8)
+        for y in range(8):
+            grid.block((12, y))
+        self.assertEqual(hpa.path((0, 0), (31, 7)), [])
+        grid.unblock((12, 4))
+        path = hpa.path((0, 0), (31, 7))
+        self.assertIn((12, 4), path)
+
+    def test_walls_on_borders(self):
+        rng = random.Random(5)
+        for seed in range(40):
+            grid = random_map(32, seed)
+            # walls with one gap, on and next to the cluster borders
+            for x in (7, 8, 15, 16):
+                if rng.random() < 0.5:
+                    gap = rng.randrange(32)
+                    for y in range(32):
+                        if y != gap:
+                            grid.block((x, y))
+            hpa = HierarchicalMap(grid, cluster_size=8)
+            for i in range(10):
+                start = rng.randrange(32), rng.randrange(32)
+                finish = rng.randrange(32), rng.randrange(32)
+                expected = astar(grid, start, finish)
+                path = hpa.path(start, finish)
+                self.assertEqual(bool(path), bool(expected))
+                if path:
+                    self.assertValid(grid, path, start, finish)
+                    self.assertLess(cost(grid, path),
+                                    cost(grid, expected) * 3)
+
+    def test_start_on_entrance(self):
+        grid = Grid(128, 128)
+        for y in range(128):
+            if y != 40:
+                grid.block((16, y))
+        hpa = HierarchicalMap(grid)
+        path = hpa.path((15, 40), (100, 100))
+        self.assertValid(grid, path, (15, 40), (100, 100))
+
+    def test_update_matches_build(self):
+        grid = random_map(40, 2)
+        hpa = HierarchicalMap(grid, cluster_size=8)
+        rng = random.Random(2)
+        for i in range(10):
+            for j in range(3):
+                position = rng.randrange(40), rng.randrange(40)
+                grid.set_cost(position, rng.choice((BLOCKED, 1.0, 2.0)))
+            hpa.build()
+            full = HierarchicalMap(grid, cluster_size=8)
+            self.assertEqual(hpa.edges, full.edges)
+            self.assertEqual(hpa.cluster_nodes, full.cluster_nodes)
+
+
+class DStarLiteTests(unittest.TestCase):
+    def test_repairs_match_astar(self):
+        for seed in range(10):
+            grid = random_map(24, seed)
+            rng = random.Random(seed)
+            goal = (23, 23)
+            grid.unblock(goal)
+            position = (0, 0)
+            planner = DStarLite(grid, position, goal)
+            for tick in range(10):
+                for i in range(3):
+                    cell = rng.randrange(24), rng.randrange(24)
+                    if cell not in (position, goal):
+                        if grid.is_blocked(cell):
+                            grid.unblock(cell)
+                        else:
+                            grid.set_cost(cell, rng.choice((2, BLOCKED)))
+                expected = astar(grid, position, goal)
+                path = planner.path()
+                self.assertEqual(bool(path), bool(expected))
+                if not path:
+                    break
+                self.assertEqual(path[0], position)
+                self.assertAlmostEqual(cost(grid, path), cost(grid, expected))
+                if len(path) > 1:
+                    position = path[1]
+                    planner.move(position)
+
+    def test_repair_is_incremental(self):
+        grid = random_map(48, 3)
+        grid.unblock((47, 47))
+        planner = DStarLite(grid, (0, 0), (47, 47))
+        path = planner.path()
+        first = planner.expanded
+        blocked = path[3]
+        grid.block(blocked)
+        path = planner.path()
+        self.assertTrue(path)
+        self.assertNotIn(blocked, path)
+        self.assertLess(planner.expanded - first, first / 4)
+
+    def test_blocked_start(self):
+        grid = random_map(24, 4)
+        grid.unblock((23, 23))
+        planner = DStarLite(grid, (0, 0), (23, 23))
+        planner.path()
+        # an obstacle moves onto the agent
+        grid.block((0, 0))
+        grid.unblock((1, 1))
+        expected = astar(grid, (0, 0), (23, 23))
+        path = planner.path()
+        self.assertTrue(expected)
+        self.assertEqual(path[0], (0, 0))
+        self.assertAlmostEqual(cost(grid, path), cost(grid, expected))
+
+
+class FlowFieldTests(unittest.TestCase):
+    def test_same_cost_as_astar(self):
+        grid = random_map(32, 2)
+        for x in range(32):
+            grid.set_cost((x, 7), 3)
+        field = FlowField(grid, (0, 0))
+        rng = random.Random(2)
+        for i in range(20):
+            start = rng.randrange(32), rng.randrange(32)
+            expected = astar(grid, start, (0, 0))
+            path = field.path(start)
+            self.assertEqual(bool(path), bool(expected))
+            if path:
+                self.assertEqual(path[0], start)
+                self.assertEqual(path[-1], (0, 0))
+                self.assertAlmostEqual(cost(grid, path), cost(grid, expected))
+                self.assertAlmostEqual(field.cost(start), cost(grid, path))
+
+    def test_next_step(self):
+        grid = Grid.from_rows(area)
+        field = FlowField(grid, (4, 4))
+        self.assertEqual(field.next_step((4, 3)), (4, 4))
+        self.assertIsNone(field.next_step((4, 4)))
+        # blocked cells can be left, as with astar
+        self.assertEqual(field.next_step((1, 0)), (2, 0))
+        self.assertFalse(field.stale)
+        grid.block((4, 3))
+        self.assertTrue(field.stale)
+        field = FlowField(grid, (4, 4))
+        self.assertIsNone(field.next_step((0, 0)))
+        self.assertEqual(field.path((0, 0)), [])
+
+
+class PathCacheTests(unittest.TestCase):
+    def test_hits_and_invalidation(self):
+        grid = Grid(10, 10)
+        cache = PathCache(astar, size=2)
+        path = cache.path(grid, (0, 0), (9, 9))
+        path.pop()
+        self.assertEqual(cache.path(grid, (0, 0), (9, 9))[-1], (9, 9))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        grid.block((5, 5))
+        self.assertNotIn((5, 5), cache.path(grid, (0, 0), (9, 9)))
+        self.assertEqual(cache.invalidations, 1)
+
+        cache.path(grid, (0, 0), (1, 1))
+        cache.path(grid, (0, 0), (2, 2))
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(len(cache), 2)
+
+
+class ReachableTests(unittest.TestCase):
+    def test_matches_brute_force(self):
+        grid = random_map(30, 4)
+        for center, radius in (((5, 5), 4), ((0, 29), 7.5), ((15, 15), 0),
+                               ((29, 3), 40), ((-3, 10), 5)):
+            reach = Reachable(grid, center, radius)
+            expected = [(x, y) for y in range(30) for x in range(30)
+                        if (x - center[0]) ** 2 + (y - center[1]) ** 2 <=
+                        radius * radius and not grid.is_blocked((x, y))]
+            self.assertEqual(list(reach), expected)
+            self.assertEqual(len(reach), len(expected))
+            for position in expected:
+                self.assertIn(position, reach)
+            self.assertNotIn((center[0] + int(radius) + 1, center[1]), reach)
+
+    def test_sample(self):
+        grid = random_map(30, 5)
+        reach = Reachable(grid, (10, 10), 6)
+        rng = random.Random(5)
+        cells = set(reach)
+        seen = set(reach.sample(rng) for i in range(2000))
+        self.assertEqual(seen, cells)
+        self.assertIsNone(Reachable(grid, (100, 100), 3).sample())
+
+    def test_disc(self):
+        self.assertEqual(disc(1), ((-1, 0), (0, 1), (1, 0)))
+        self.assertEqual(disc(1.5), ((-1, 1), (0, 1), (1, 1)))
@@ -0,0 +1,340 @@
+import unittest
+
+from helpers import DummyAction, FactAbility, StaticFactAbility
+from pygoap.agent import GoapAgent
+from pygoap.cache import PlanCache
+from pygoap.goals import *
+from pygoap.memory import MemoryLayer, MemoryManager
+from pygoap.planning import plan, regress, PlanningStats, PlanSearch
+from pygoap.precepts import *
+
+
+class PlanTests(unittest.TestCase):
+    def setUp(self):
+        self.agent = GoapAgent()
+
+    def goal(self, fact):
+        return PreceptGoal(DatumPrecept(self.agent, fact, True))
+
+    def test_chain(self):
+        abilities = {FactAbility(self.agent, "a"),
+                     FactAbility(self.agent, "b", "a"),
+                     FactAbility(self.agent, "c", "b")}
+        path = plan(self.goal("c"), self.agent, None, abilities, set())
+        facts = [i[0].effects[0].args[0].name for i in path[:-1]]
+        self.assertEqual(facts, ["c", "b", "a"])
+
+    def test_unreachable(self):
+        abilities = {FactAbility(self.agent, "a")}
+        path = plan(self.goal("z"), self.agent, None, abilities, set())
+        self.assertEqual(path, list())
+
+    def test_duplicate_states_pruned(self):
+        n = 6
+        abilities = {FactAbility(self.agent, i) for i in range(n)}
+        stats = PlanningStats()
+        plan(self.goal("z"), self.agent, None, abilities, set(), stats)
+        self.assertEqual(stats.expanded, 2 ** n)
+
+    def test_heuristic_reduces_expansions(self):
+        abilities = {FactAbility(self.agent, i) for i in range(8)}
+        goal = PreceptGoal(*(DatumPrecept(self.agent, i, True)
+                             for i in range(4)))
+        uniform, informed = PlanningStats(), PlanningStats()
+        path0 = plan(goal, self.agent, None, abilities, set(), uniform,
+                     lambda memory: 1)
+        path1 = plan(goal, self.agent, None, abilities, set(), informed)
+        self.assertEqual(len(path0), len(path1))
+        self.assertLess(informed.expanded, uniform.expanded)
+
+    def test_goal_pretest_skips_tests(self):
+        tested = list()
+
+        class MoodGoal(PreceptGoal):
+            def test(self, memory):
+                tested.append(memory)
+                return super().test(memory)
+
+        abilities = {FactAbility(self.agent, i) for i in range(4)}
+        goal = MoodGoal(MoodPrecept(self.agent, "happy", True))
+        stats = PlanningStats()
+        plan(goal, self.agent, None, abilities, set(), stats)
+        # no action adds a mood, so only the first node is tested
+        self.assertEqual(stats.expanded, 2 ** 4)
+        self.assertEqual(len(tested), 1)
+
+    def test_action_pretest(self):
+        abilities = {FactAbility(self.agent, "b", "a")}
+        stats = PlanningStats()
+        plan(self.goal("b"), self.agent, None, abilities, set(), stats)
+        self.assertEqual(stats.generated, 0)
+        memory = {DatumPrecept(self.agent, "a", True)}
+        path = plan(self.goal("b"), self.agent, None, abilities, memory)
+        self.assertEqual(len(path), 2)
+
+    def test_large_start_memory(self):
+        # more precepts than a default memory holds; the first is the goal
+        memory = [DatumPrecept(self.agent, "a", True)]
+        memory.extend(DatumPrecept(self.agent, i, True) for i in range(400))
+        abilities = {FactAbility(self.agent, "b")}
+        path = plan(self.goal("a"), self.agent, None, abilities, memory)
+        self.assertEqual(path, [[None]])
+
+
+class StaticAbility(FactAbility):
+    static = True
+    made = 0
+
+    def get_actions(self, caller, memory=None):
+        StaticAbility.made += 1
+        return super().get_actions(caller, memory)
+
+
+class ActionTableTests(unittest.TestCase):
+    def setUp(self):
+        StaticAbility.made = 0
+        self.agent = GoapAgent()
+
+    def test_actions_made_once(self):
+        agent = self.agent
+        abilities = {StaticAbility(agent, i) for i in range(4)}
+        abilities.add(FactAbility(agent, "b", 0))
+        goal = PreceptGoal(DatumPrecept(agent, "z", True))
+        plan(goal, agent, None, abilities, set())
+        plan(goal, agent, None, abilities, set())
+        self.assertEqual(StaticAbility.made, 4)
+        self.assertEqual(len(agent.action_table), 4)
+
+    def test_plans_get_copies(self):
+        agent = self.agent
+        abilities = {StaticAbility(agent, "a")}
+        goal = PreceptGoal(DatumPrecept(agent, "a", True))
+        first = plan(goal, agent, None, abilities, set())[0][0]
+        second = plan(goal, agent, None, abilities, set())[0][0]
+        self.assertIsNot(first, second)
+        self.assertFalse(first.template)
+        self.assertEqual(first.effects, second.effects)
+
+
+class RegressTests(unittest.TestCase):
+    def setUp(self):
+        self.agent = GoapAgent()
+        self.chain = {FactAbility(self.agent, "a"),
+                      FactAbility(self.agent, "b", "a"),
+                      FactAbility(self.agent, "c", "b")}
+
+    def goal(self, fact):
+        return PreceptGoal(DatumPrecept(self.agent, fact, True))
+
+    def facts(self, path):
+        return [i[0].effects[0].args[0].name for i in path[:-1]]
+
+    def test_same_result_as_plan(self):
+        for fact in ("a", "b", "c"):
+            forward = plan(self.goal(fact), self.agent, None, self.chain,
+                           set())
+            backward = regress(self.goal(fact), self.agent, None, self.chain,
+                               set())
+            self.assertEqual(self.facts(forward), self.facts(backward))
+            self.assertEqual(backward[-1], [None])
+
+    def test_known_precepts(self):
+        memory = {DatumPrecept(self.agent, "a", True)}
+        path = regress(self.goal("c"), self.agent, None, self.chain, memory)
+        self.assertEqual(self.facts(path), ["c", "b"])
+
+    def test_unreachable(self):
+        path = regress(self.goal("z"), self.agent, None, self.chain, set())
+        self.assertEqual(path, list())
+
+    def test_expands_fewer_nodes(self):
+        abilities = set(self.chain)
+        abilities.update(FactAbility(self.agent, i) for i in range(8))
+        forward, backward = PlanningStats(), PlanningStats()
+        plan(self.goal("c"), self.agent, None, abilities, set(), forward)
+        regress(self.goal("c"), self.agent, None, abilities, set(), backward)
+        self.assertEqual(backward.expanded, 3)
+        self.assertLess(backward.expanded, forward.expanded)
+
+    def test_agent_chooses_search(self):
+        self.agent.abilities.update(self.chain)
+        self.agent.goals.add(PreceptGoal(DatumPrecept(self.agent, "c", True),
+                                         regressive=True))
+        self.assertEqual(self.facts(self.agent.find_plan() + [None]),
+                         ["c", "b", "a"])
+
+
+class BoundedPlanTests(unittest.TestCase):
+    def setUp(self):
+        self.agent = GoapAgent()
+        self.abilities = {FactAbility(self.agent, i) for i in range(6)}
+        self.goal = PreceptGoal(*(DatumPrecept(self.agent, i, True)
+                                  for i in range(4)))
+
+    def test_resume(self):
+        expected = PlanningStats()
+        path = plan(self.goal, self.agent, None, self.abilities, set(),
+                    expected)
+        search = PlanSearch(self.goal, self.agent, None, self.abilities,
+                            set())
+        self.assertIsNone(search.run(max_expanded=2))
+        self.assertIsNone(search.run(max_time=0))
+        self.assertEqual(search.stats.expanded, 2)
+        self.assertFalse(search.done)
+        self.assertEqual(len(search.run()), len(path))
+        self.assertEqual(search.stats.expanded, expected.expanded)
+
+    def test_budget(self):
+        path = plan(self.goal, self.agent, None, self.abilities, set(),
+                    max_expanded=2)
+        self.assertEqual(path, list())
+
+    def test_anytime(self):
+        path = plan(self.goal, self.agent, None, self.abilities, set(),
+                    max_expanded=2, anytime=True)
+        self.assertEqual(len(path), 3)
+        self.assertEqual(path[-1], [None])
+
+    def test_agent_resumes_next_time(self):
+        agent = self.agent
+        agent.abilities.update(self.abilities)
+        agent.goals.add(self.goal)
+        agent.plan_budget = 1
+        tries = 1
+        while not agent.find_plan():
+            self.assertIsNotNone(agent.search)
+            tries += 1
+        self.assertEqual(len(agent.plan), 4)
+        self.assertGreater(tries, 1)
+        self.assertIsNone(agent.search)
+
+    def test_regressive_goals_keep_to_budget(self):
+        class FactsGoal(GoalBase):
+            # not a PreceptGoal, so it is planned forward
+            def __init__(self, facts):
+                super().__init__()
+                self.facts = facts
+
+            def test(self, memory):
+                return all(fact in memory for fact in self.facts)
+
+        agent = self.agent
+        agent.abilities.update(self.abilities)
+        agent.plan_budget = 1
+        agent.regressive = True
+        for goal in (self.goal, FactsGoal(self.goal.args)):
+            agent.goals = GoalSet([goal])
+            tries = 1
+            while not agent.find_plan():
+                self.assertIsNotNone(agent.search)
+                tries += 1
+            self.assertEqual(len(agent.plan), 4)
+            self.assertGreater(tries, 1)
+
+    def test_regress_budget(self):
+        path = regress(self.goal, self.agent, None, self.abilities, set(),
+                       max_expanded=2)
+        self.assertEqual(path, list())
+        path = regress(self.goal, self.agent, None, self.abilities, set())
+        self.assertEqual(len(path), 5)
+
+
+class MemoryLayerTests(unittest.TestCase):
+    def setUp(self):
+        self.base = MemoryManager()
+        self.base.add(TimePrecept(1))
+        self.layer = MemoryLayer(self.base)
+
+    def test_add_does_not_touch_base(self):
+        self.layer.add(TimePrecept(2))
+        self.assertIn(TimePrecept(2), self.layer)
+        self.assertNotIn(TimePrecept(2), self.base)
+
+    def test_copy_shares_base(self):
+        self.layer.add(TimePrecept(2))
+        child = self.layer.copy()
+        child.add(TimePrecept(3))
+        self.assertIs(child.base, self.base)
+        self.assertNotIn(TimePrecept(3), self.layer)
+        self.assertEqual(len(child), 3)
+
+    def test_of_class(self):
+        self.layer.add(DatumPrecept(None, "a", 1))
+        self.assertEqual(set(self.layer.of_class(TimePrecept)),
+                         {TimePrecept(1)})
+        self.assertEqual(set(self.layer.of_class(DatumPrecept)),
+                         {DatumPrecept(None, "a", 1)})
+
+    def test_lookups(self):
+        agent = GoapAgent()
+        self.base.add(DatumPrecept(agent, "a", 1))
+        self.layer.add(DatumPrecept(agent, "a", 2))
+        self.layer.add(DatumPrecept(None, "b", 1))
+        layer = self.layer
+        self.assertEqual(list(layer.of_key(DatumPrecept, agent, "a")),
+                         [DatumPrecept(agent, "a", 1),
+                          DatumPrecept(agent, "a", 2)])
+        self.assertEqual(layer.latest(DatumPrecept, agent, "a"),
+                         DatumPrecept(agent, "a", 2))
+        self.assertIsNone(layer.latest(DatumPrecept, agent, "c"))
+        self.assertEqual(set(layer.of_entity(agent)),
+                         {DatumPrecept(agent, "a", 1),
+                          DatumPrecept(agent, "a", 2)})
+        self.assertEqual(set(layer.entities()), {agent, None})
+
+
+class PlanCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.agent = GoapAgent()
+        self.agent.plan_cache = PlanCache(2)
+        self.agent.abilities.add(StaticFactAbility(self.agent, "a"))
+        self.agent.abilities.add(StaticFactAbility(self.agent, "b", "a"))
+
+    def test_hit(self):
+        agent = self.agent
+        agent.goals.add(PreceptGoal(DatumPrecept(agent, "b", True)))
+        first = agent.find_plan()
+        second = agent.find_plan()
+        self.assertEqual(len(first), len(second))
+        self.assertIsNot(first[0][0], second[0][0])
+        self.assertEqual(agent.plan_cache.hits, 1)
+        self.assertEqual(agent.plan_cache.misses, 1)
+
+    def test_eviction(self):
+        agent = self.agent
+        cache = agent.plan_cache
+        for fact in "abc":
+            goal = PreceptGoal(DatumPrecept(agent, fact, True))
+            cache.plan(goal, agent, None, agent.abilities, set())
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_invalidate(self):
+        agent = self.agent
+        cache = agent.plan_cache
+        goal = PreceptGoal(DatumPrecept(agent, "b", True))
+        cache.plan(goal, agent, None, agent.abilities, set())
+        cache.invalidate(TimePrecept)
+        self.assertEqual(len(cache), 1)
+        cache.invalidate(DatumPrecept)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.invalidations, 1)
+
+    def test_prereq_types_in_key(self):
+        class MoodAbility(FactAbility):
+            def get_actions(self, caller, memory=None):
+                prereqs = [PreceptGoal(MoodPrecept(caller, "ready", True))]
+                effects = [PreceptGoal(DatumPrecept(caller, "b", True))]
+                yield DummyAction(caller, prereqs, effects)
+
+        class StaticMoodAbility(MoodAbility):
+            static = True
+
+        for ability in (MoodAbility, StaticMoodAbility):
+            agent = GoapAgent()
+            agent.plan_cache = PlanCache()
+            agent.abilities.add(ability(agent, "b"))
+            agent.goals.add(PreceptGoal(DatumPrecept(agent, "b", True)))
+            self.assertEqual(agent.find_plan(), [])
+            agent.process(MoodPrecept(agent, "ready", True))
+            self.assertEqual(len(agent.find_plan()), 1)
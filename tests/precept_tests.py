@@ -0,0 +1,55 @@
+import pickle
+import unittest
+
+from pygoap.precepts import *
+
+
+class PreceptTests(unittest.TestCase):
+    def test_interned(self):
+        entity = object()
+        a = DatumPrecept(entity, "name", "a")
+        self.assertIs(a, DatumPrecept(entity, "name", "a"))
+        self.assertIs(a, DatumPrecept(entity=entity, name="name", value="a"))
+        self.assertIsNot(a, DatumPrecept(entity, "name", "b"))
+
+    def test_equal_values_of_other_types(self):
+        values = [DatumPrecept(None, "count", value).value
+                  for value in (True, 1, 1.0)]
+        self.assertEqual([type(value) for value in values],
+                         [bool, int, float])
+        entity = object()
+        first = PositionPrecept(entity, (1, 1))
+        second = PositionPrecept(entity, (1.0, 1.0))
+        self.assertIsNot(first, second)
+        self.assertEqual(type(second.position[0]), float)
+
+    def test_unhashable(self):
+        with self.assertRaises(TypeError):
+            SpeechPrecept("a", ["hello"])
+
+    def test_types_differ(self):
+        self.assertNotEqual(DatumPrecept(None, "a", 1),
+                            MoodPrecept(None, "a", 1))
+
+    def test_fields(self):
+        p = ActionPrecept("a", "sex", "b")
+        self.assertEqual(p.action, "sex")
+        self.assertEqual(tuple(p), ("a", "sex", "b"))
+        self.assertEqual(p._replace(object="c"),
+                         ActionPrecept("a", "sex", "c"))
+        self.assertEqual(repr(TimePrecept(1)), "TimePrecept(time=1)")
+
+    def test_immutable(self):
+        p = TimePrecept(1)
+        with self.assertRaises(AttributeError):
+            p.time = 2
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(TypeError):
+            TimePrecept(1, 2)
+        with self.assertRaises(TypeError):
+            DatumPrecept(None, "a")
+
+    def test_pickle(self):
+        p = SpeechPrecept("a", "hello")
+        self.assertIs(pickle.loads(pickle.dumps(p)), p)
@@ -0,0 +1,109 @@
+import unittest
+
+from pygoap import batch_easing, easing
+from pygoap.actions import Action
+from pygoap.agent import GoapAgent
+from pygoap.environment import Environment
+from pygoap.progress import ActionProgress, finish_point
+
+
+class TimedAction(Action):
+    default_duration = 3.0
+
+    def update(self, dt):
+        yield None
+
+
+class WaitAction(Action):
+    default_duration = 2.0
+
+
+class BatchEasingTests(unittest.TestCase):
+    def test_matches_scalar(self):
+        values = [i / 100.0 for i in range(101)]
+        for name in batch_easing._names:
+            func = getattr(easing, name)
+            batch = batch_easing.batch(func)
+            for p, eased in zip(values, batch(values)):
+                self.assertAlmostEqual(eased, func(p), places=12, msg=name)
+
+    def test_unknown_function(self):
+        batch = batch_easing.batch(lambda p: p / 2)
+        self.assertEqual(list(batch([0.0, 1.0])), [0.0, 0.5])
+
+
+class ActionProgressTests(unittest.TestCase):
+    def test_advance(self):
+        store = ActionProgress()
+        agent = GoapAgent()
+        actions = [TimedAction(agent) for i in range(40)]
+        for i, action in enumerate(actions):
+            action._duration = i % 4 + 1
+            action.easing = (easing.linear, easing.in_sine,
+                             easing.in_back)[i % 3]
+            store.add(action)
+
+        finished = list()
+        for tick in range(4):
+            done = store.advance(1.0)
+            for action in done:
+                self.assertEqual(action.duration, tick + 1)
+                self.assertEqual(action.elapsed_teme, tick + 1)
+                self.assertIsNone(action._store)
+            finished.extend(done)
+        self.assertEqual(len(finished), 40)
+        self.assertEqual(len(store), 0)
+
+    def test_progress(self):
+        store = ActionProgress()
+        action = TimedAction(GoapAgent())
+        action.easing = easing.in_quad
+        store.add(action)
+        store.advance(1.5)
+        self.assertAlmostEqual(action.progress, 0.25)
+        self.assertFalse(action.finished)
+
+    def test_finish_point(self):
+        self.assertEqual(finish_point(easing.linear), 1.0)
+        self.assertEqual(finish_point(easing.in_sine), 1.0)
+        point = finish_point(easing.out_back)
+        self.assertLess(point, 1.0)
+        self.assertGreaterEqual(easing.out_back(point), 1.0)
+        self.assertLess(easing.out_back(point - 1e-6), 1.0)
+
+    def test_step_without_environment(self):
+        action = WaitAction(GoapAgent())
+        list(action.step(1.5))
+        self.assertFalse(action.finished)
+        list(action.step(1.5))
+        self.assertTrue(action.finished)
+        self.assertEqual(action.progress, 1.0)
+
+    def test_schedule(self):
+        store = ActionProgress()
+        agent = GoapAgent()
+        waiting, timed = WaitAction(agent), TimedAction(agent)
+        store.add(waiting)
+        store.add(timed)
+        self.assertEqual(store.active, [timed])
+        self.assertEqual(store.next_time(), 2.0)
+        self.assertEqual(store.advance(2.0), [waiting])
+        self.assertEqual(store.next_time(), 3.0)
+        actions, progress = store.progress_all()
+        self.assertEqual(actions, [timed])
+        self.assertAlmostEqual(progress[0], 2 / 3.0)
+
+    def test_environment_finishes_actions(self):
+        env = Environment()
+        agent = GoapAgent()
+        env.add(agent)
+        first, second = TimedAction(agent), TimedAction(agent)
+        agent.apply_plan([[second], [first]])
+        env.update(1)
+        self.assertIn(first, env.progress)
+        for i in range(2):
+            env.update(1)
+        self.assertNotIn(first, env.progress)
+        self.assertIn(second, env.progress)
+        # the next action starts in the tick the first one finished
+        self.assertEqual(second.elapsed_teme, 1.0)